@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from database import get_data_version
+
+CACHE_SIZE = 1024
+CACHE_TTL = 300.0
+VERSION_CHECK_INTERVAL = 5.0
+
+
+class ToolCache:
+    '''LRU cache of tool results with a TTL.
+
+    Entries are dropped whenever the data version stamp bumped by the market
+    pipeline changes. The stamp lives in the database because the pipeline
+    runs in another process, and it is read at most once every
+    `version_check_interval` seconds.
+    '''
+
+    def __init__(
+            self,
+            maxsize: int = CACHE_SIZE,
+            ttl: float = CACHE_TTL,
+            version_check_interval: float = VERSION_CHECK_INTERVAL
+            ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[Hashable, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._version_checked = float('-inf')
+
+    def _check_version(self, now: float):
+        if now - self._version_checked < self.version_check_interval:
+            return
+        self._version_checked = now
+
+        try:
+            version = get_data_version()
+        except Exception:
+            # Without a stamp table, entries only expire through the TTL
+            return
+
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(now)
+
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, func: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is None:
+            value = func()
+            # Errors are returned as text, they are not worth keeping
+            if not value.startswith('Error:'):
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int | None]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'version': self._version,
+            }
+
+
+tool_cache = ToolCache()
+
+
+def get_cache_stats() -> dict[str, int | None]:
+    return tool_cache.stats()
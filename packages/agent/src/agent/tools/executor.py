@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from database import connect_database
+
+TOOL_MAX_WORKERS = 8
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    # Shared by every tool, so concurrent calls are bounded process-wide
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=TOOL_MAX_WORKERS,
+                thread_name_prefix='agent-tool'
+            )
+        return _executor
+
+
+async def run_in_tool_executor(
+        func: Callable[..., str],
+        *args: Any,
+        **kwargs: Any
+        ) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_tool_executor(),
+        partial(func, *args, **kwargs)
+    )
+
+
+def run_with_pooled_connection(
+        func: Callable[..., str],
+        *args: Any,
+        **kwargs: Any
+        ) -> str:
+    try:
+        database = connect_database(pooled=True)
+    except:
+        return 'Error: Something went wrong while trying to connect database.'
+
+    # Pooled connections are checked out per thread, so calls running on
+    # the shared tool executor do not serialize on one connection
+    with database.connection_context():
+        return func(*args, **kwargs)
@@ -4,48 +4,63 @@ import json
 import pandas as pd
 from crewai.tools import BaseTool
 from datetime import datetime, timedelta
-from peewee import fn
 from pydantic import BaseModel, Field
 
 from database import (
     Sector,
     Stock,
-    StockDaily,
     Currency,
-    CurrencyDaily,
-    connect_database
+    ReturnsDaily
 )
+from database.columnar import currency_pair_key
+from database.latest import latest_returns_query
 
+from .cache import tool_cache
+from .executor import run_in_tool_executor, run_with_pooled_connection
 
-def _calculate_change(series: pd.Series, lag: int = 1) -> float:
-    return series.iloc[-1] / series.iloc[-1 - lag] - 1
+TREND_FIELDS = ('change_1d', 'change_7d', 'change_30d', 'change_60d')
 
 
 def _parse_percent(value: float) -> str:
     return f'{value * 100:+.2f}%'
 
 
-def _extract_trends(data: pd.DataFrame) -> str:
-    data['date'] = pd.to_datetime(data['date'])
-    data = data.set_index('date').resample('D').ffill()
-
+def _get_trends(
+        asset_type: str,
+        asset_code: str,
+        start_date: datetime,
+        end_date: datetime
+        ) -> str:
+    # Trends are materialized by the pipeline, so this is a point lookup of
+    # the latest bar up to `end_date`
+    returns = latest_returns_query(
+        asset_type,
+        [asset_code],
+        start_date,
+        end_date
+    ).get()
+
+    return json.dumps(_format_trends(returns))
+
+
+def _get_latest_returns(
+        asset_type: str,
+        asset_codes: list[str],
+        start_date: datetime,
+        end_date: datetime
+        ) -> dict[str, ReturnsDaily]:
+    # Latest bar up to `end_date` of every asset, in one lookup
+    query = latest_returns_query(asset_type, asset_codes, start_date, end_date)
+    return {returns.asset_code: returns for returns in query}
+
+
+def _format_trends(returns: ReturnsDaily) -> dict[str, str]:
     trends = {}
-    trends['change_1d'] = _parse_percent(
-        _calculate_change(data['close'])
-    )
-    if len(data) >= 7:
-        trends['change_7d'] = _parse_percent(
-            _calculate_change(data['close'], 7)
-        )
-    if len(data) >= 30:
-        trends['change_30d'] = _parse_percent(
-            _calculate_change(data['close'], 30)
-        )
-    if len(data) >= 60:
-        trends['change_60d'] = _parse_percent(
-            _calculate_change(data['close'], 60)
-        )
-    return json.dumps(trends)
+    for name in TREND_FIELDS:
+        value = getattr(returns, name)
+        if value is not None:
+            trends[name] = _parse_percent(value)
+    return trends
 
 
 class StockMarketShema(BaseModel):
@@ -99,11 +114,21 @@ class StockMarketTool(BaseTool):
                 "formatted in 'YYYY-MM-DD'."
             )
 
-        try:
-            connect_database()
-        except:
-            return 'Error: Something went wrong while trying to connect database.'
+        return run_with_pooled_connection(
+            tool_cache.get_or_set,
+            (self.name, stock_code, end_date.date()),
+            lambda: self._query(stock_code, start_date, end_date)
+        )
+
+    async def _arun(self, **kwargs: Any) -> str:
+        return await run_in_tool_executor(self._run, **kwargs)
 
+    def _query(
+            self,
+            stock_code: str,
+            start_date: datetime,
+            end_date: datetime
+            ) -> str:
         try:
             stock = Stock.select().where(Stock.code == stock_code).get()
         except:
@@ -113,20 +138,12 @@ class StockMarketTool(BaseTool):
             )
 
         try:
-            data = pd.DataFrame(
-                StockDaily.select()
-                .where(
-                    (StockDaily.stock == stock)
-                    & (StockDaily.date >= start_date)
-                    & (StockDaily.date <= end_date)
-                )
-                .order_by(StockDaily.date)
-                .dicts()
+            trends = _get_trends(
+                ReturnsDaily.STOCK,
+                stock.code,
+                start_date,
+                end_date
             )
-            if len(data) < 1:
-                raise
-
-            trends = _extract_trends(data)
         except:
             return 'Error: Something went wrong while trying to get the data.'
 
@@ -184,11 +201,21 @@ class SectoralMarketTool(BaseTool):
                 "formatted in 'YYYY-MM-DD'."
             )
 
-        try:
-            connect_database()
-        except:
-            return 'Error: Something went wrong while trying to connect database.'
+        return run_with_pooled_connection(
+            tool_cache.get_or_set,
+            (self.name, sector_code, end_date.date()),
+            lambda: self._query(sector_code, start_date, end_date)
+        )
+
+    async def _arun(self, **kwargs: Any) -> str:
+        return await run_in_tool_executor(self._run, **kwargs)
 
+    def _query(
+            self,
+            sector_code: str,
+            start_date: datetime,
+            end_date: datetime
+            ) -> str:
         try:
             sector = Sector.select().where(Sector.code == sector_code).get()
         except:
@@ -198,29 +225,12 @@ class SectoralMarketTool(BaseTool):
             )
 
         try:
-            data = pd.DataFrame(
-                StockDaily
-                .select(
-                    StockDaily.date,
-                    (
-                        fn.SUM(StockDaily.close * Stock.volume)
-                        / fn.SUM(Stock.volume)
-                    ).alias('close')
-                )
-                .join(Stock)
-                .where(
-                    (Stock.sector == sector)
-                    & (StockDaily.date >= start_date)
-                    & (StockDaily.date <= end_date)
-                )
-                .group_by(StockDaily.date)
-                .order_by(StockDaily.date)
-                .dicts()
+            trends = _get_trends(
+                ReturnsDaily.SECTOR,
+                sector.code,
+                start_date,
+                end_date
             )
-            if len(data) < 1:
-                raise
-
-            trends = _extract_trends(data)
         except:
             return 'Error: Something went wrong while trying to get the data.'
 
@@ -280,11 +290,21 @@ class CurrencyMarketTool(BaseTool):
                 "formatted in 'YYYY-MM-DD'."
             )
 
-        try:
-            connect_database()
-        except:
-            return 'Error: Something went wrong while trying to connect database.'
+        return run_with_pooled_connection(
+            tool_cache.get_or_set,
+            (self.name, currency_code, end_date.date()),
+            lambda: self._query(currency_code, start_date, end_date)
+        )
 
+    async def _arun(self, **kwargs: Any) -> str:
+        return await run_in_tool_executor(self._run, **kwargs)
+
+    def _query(
+            self,
+            currency_code: str,
+            start_date: datetime,
+            end_date: datetime
+            ) -> str:
         try:
             currency = (
                 Currency.select()
@@ -298,22 +318,134 @@ class CurrencyMarketTool(BaseTool):
             )
 
         try:
-            data = pd.DataFrame(
-                CurrencyDaily.select()
-                .where(
-                    (CurrencyDaily.from_currency_code == 'USD')
-                    & (CurrencyDaily.to_currency == currency)
-                    & (CurrencyDaily.date >= start_date)
-                    & (CurrencyDaily.date <= end_date)
-                )
-                .order_by(CurrencyDaily.date)
-                .dicts()
+            trends = _get_trends(
+                ReturnsDaily.CURRENCY,
+                currency_pair_key('USD', currency.code),
+                start_date,
+                end_date
+            )
+        except:
+            return 'Error: Something went wrong while trying to get the data.'
+
+        return trends
+
+
+class PortfolioMarketShema(BaseModel):
+    '''Input for PortfolioMarketTool'''
+
+    stock_codes: list[str] = Field(
+        description='Mandatory list of stock codes in the portfolio'
+    )
+    current_date: str = Field(
+        description=
+            "Mandatory current date formatted in 'YYYY-MM-DD' to be as "
+            'the reference of the last date of the historical data'
+    )
+
+
+class PortfolioMarketTool(BaseTool):
+    '''A tool to query price trends of a portfolio of stocks.'''
+
+    name: str = 'Get recent price trends of a portfolio of stocks'
+    description: str = (
+        'A tool that return recent price trends in 1D, 7D, 30D, and 60D of '
+        'every stock in a portfolio, along with the equally weighted '
+        'portfolio average and its best and worst stocks. To use this tool, '
+        'provide `stock_codes` parameter with the list of stock codes and '
+        '`current_date` parameter with the date formatted in `YYYY-MM-DD` '
+        'to be used as a reference of the latest date.'
+    )
+    args_schema: Type[BaseModel] = PortfolioMarketShema
+
+    def _run(self, **kwargs: Any) -> str:
+        stock_codes = kwargs.get("stock_codes")
+        current_date = kwargs.get("current_date")
+
+        if not stock_codes:
+            return (
+                'Error: No `stock_codes` is provided. Please provide them '
+                'either in the constructor or as an argument.'
+            )
+
+        if current_date is None:
+            return (
+                'Error: No `current_date` is provided. Please provide one '
+                'either in the constructor or as an argument.'
+            )
+
+        try:
+            end_date = datetime.fromisoformat(current_date)
+            start_date = end_date - timedelta(days=70)
+        except:
+            return (
+                'Error: Wrong `current_date` format. Please provide date '
+                "formatted in 'YYYY-MM-DD'."
+            )
+
+        stock_codes = sorted(set(stock_codes))
+        return run_with_pooled_connection(
+            tool_cache.get_or_set,
+            (self.name, tuple(stock_codes), end_date.date()),
+            lambda: self._query(stock_codes, start_date, end_date)
+        )
+
+    async def _arun(self, **kwargs: Any) -> str:
+        return await run_in_tool_executor(self._run, **kwargs)
+
+    def _query(
+            self,
+            stock_codes: list[str],
+            start_date: datetime,
+            end_date: datetime
+            ) -> str:
+        try:
+            latest_returns = _get_latest_returns(
+                ReturnsDaily.STOCK,
+                stock_codes,
+                start_date,
+                end_date
             )
-            if len(data) < 1:
+            if len(latest_returns) < 1:
                 raise
 
-            trends = _extract_trends(data)
+            # Latest bar of every stock, then the portfolio across stocks
+            latest = pd.DataFrame(
+                [
+                    [getattr(returns, name) for name in TREND_FIELDS]
+                    for returns in latest_returns.values()
+                ],
+                index=pd.Index(list(latest_returns), name='stock_code'),
+                columns=list(TREND_FIELDS),
+                dtype=float
+            ).sort_index()
+            average = latest.mean()
         except:
             return 'Error: Something went wrong while trying to get the data.'
 
-        return trends
+        trends = {
+            'portfolio': {
+                name: _parse_percent(value)
+                for name, value in average.dropna().items()
+            },
+            'best': {
+                name: latest[name].idxmax()
+                for name in TREND_FIELDS
+                if latest[name].notna().any()
+            },
+            'worst': {
+                name: latest[name].idxmin()
+                for name in TREND_FIELDS
+                if latest[name].notna().any()
+            },
+            'stocks': {
+                stock_code: {
+                    name: _parse_percent(value)
+                    for name, value in row.dropna().items()
+                }
+                for stock_code, row in latest.iterrows()
+            },
+        }
+        missing = [code for code in stock_codes if code not in latest.index]
+        if len(missing) > 0:
+            trends['missing'] = missing
+        return json.dumps(trends, separators=(',', ':'))
@@ -0,0 +1,154 @@
+from typing import Any, Type
+
+import json
+from crewai.tools import BaseTool
+from datetime import datetime, timedelta
+from pydantic import BaseModel, Field
+
+from database import StrategyEvaluation
+from database.latest import latest_evaluations_query
+
+from .cache import tool_cache
+from .executor import run_in_tool_executor, run_with_pooled_connection
+
+# Evaluations are written on trading days only, so a weekend or holiday
+# falls back to the latest evaluation within this window
+EVALUATION_WINDOW_DAYS = 7
+
+
+def _to_output(
+        evaluation: StrategyEvaluation,
+        fields: list[str] | None
+        ) -> dict[str, Any]:
+    output = {
+        'date': str(evaluation.date),
+        'signal': StrategyEvaluation.SIGNAL_LABELS[evaluation.signal],
+    }
+    for name in StrategyEvaluation.METRICS:
+        value = getattr(evaluation, name)
+        if value is not None:
+            output[name] = value
+
+    if fields is None:
+        return output
+    return {
+        name: value
+        for name, value in output.items()
+        if name == 'date' or name in fields
+    }
+
+
+def _get_signals(
+        stock_codes: list[str],
+        start_date: datetime,
+        end_date: datetime,
+        fields: list[str] | None
+        ) -> str:
+    query = latest_evaluations_query(stock_codes, start_date, end_date)
+
+    signals = {
+        stock_code: 'No evaluation is available.'
+        for stock_code in stock_codes
+    }
+    for evaluation in query:
+        stock_code = evaluation.stock_code
+        if not isinstance(signals[stock_code], dict):
+            signals[stock_code] = {}
+        signals[stock_code][evaluation.strategy.name] = \
+            _to_output(evaluation, fields)
+    return json.dumps(signals)
+
+
+class StrategySignalShema(BaseModel):
+    '''Input for StrategySignalTool'''
+
+    stock_codes: list[str] = Field(
+        description='Mandatory list of stock codes to get the strategy signals'
+    )
+    current_date: str = Field(
+        description=
+            "Mandatory current date formatted in 'YYYY-MM-DD' to be as "
+            'the reference of the last date of the evaluations'
+    )
+    fields: list[str] | None = Field(
+        default=None,
+        description=
+            'Optional list of evaluation fields to return, e.g. `signal`, '
+            '`current_price`, `rsi` or `bandwidth`. All fields are returned '
+            'if not provided.'
+    )
+
+
+class StrategySignalTool(BaseTool):
+    '''A tool to query the latest strategy signals of stocks.'''
+
+    name: str = 'Get latest strategy signals of stocks'
+    description: str = (
+        'A tool that return the latest Buy, Sell, or Hold signals of stocks '
+        'from the Bollinger Bands, Donchian Channel Breakout, and Relative '
+        'Strength Index (RSI) strategies, along with the indicator values '
+        'behind them. To use this tool, provide `stock_codes` parameter '
+        'with the list of stock codes you want to query and `current_date` '
+        'parameter with the date formatted in `YYYY-MM-DD` to be used as a '
+        'reference of the latest date. Optionally provide `fields` to only '
+        'get some of the evaluation fields, e.g. `["signal"]`.'
+    )
+    args_schema: Type[BaseModel] = StrategySignalShema
+
+    def _run(self, **kwargs: Any) -> str:
+        stock_codes = kwargs.get("stock_codes")
+        current_date = kwargs.get("current_date")
+        fields = kwargs.get("fields")
+
+        if not stock_codes:
+            return (
+                'Error: No `stock_codes` is provided. Please provide them '
+                'either in the constructor or as an argument.'
+            )
+
+        if current_date is None:
+            return (
+                'Error: No `current_date` is provided. Please provide one '
+                'either in the constructor or as an argument.'
+            )
+
+        try:
+            end_date = datetime.fromisoformat(current_date)
+            start_date = end_date - timedelta(days=EVALUATION_WINDOW_DAYS)
+        except:
+            return (
+                'Error: Wrong `current_date` format. Please provide date '
+                "formatted in 'YYYY-MM-DD'."
+            )
+
+        stock_codes = sorted(set(stock_codes))
+        if fields is not None:
+            fields = list(dict.fromkeys(fields))
+        key = (
+            self.name,
+            tuple(stock_codes),
+            end_date.date(),
+            None if fields is None else tuple(fields)
+        )
+        return run_with_pooled_connection(
+            tool_cache.get_or_set,
+            key,
+            lambda: self._query(stock_codes, start_date, end_date, fields)
+        )
+
+    async def _arun(self, **kwargs: Any) -> str:
+        return await run_in_tool_executor(self._run, **kwargs)
+
+    def _query(
+            self,
+            stock_codes: list[str],
+            start_date: datetime,
+            end_date: datetime,
+            fields: list[str] | None
+            ) -> str:
+        try:
+            signals = _get_signals(stock_codes, start_date, end_date, fields)
+        except:
+            return 'Error: Something went wrong while trying to get the data.'
+
+        return signals
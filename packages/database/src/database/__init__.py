@@ -4,15 +4,25 @@ from .database import (
     Sector,
     Stock,
     StockDaily,
+    SectorIndexDaily,
+    ReturnsDaily,
     Currency,
     CurrencyDaily,
     UserStockTrade,
     UserStockWatchlist,
     Strategy,
     StrategyEvaluation,
+    IndicatorState,
+    DataVersion,
+    TradingHoliday,
+    PipelineCheckpoint,
+    EmptyFetchRange,
+    EpochDayField,
     connect_database,
     create_database,
-    enable_debug
+    enable_debug,
+    get_data_version,
+    bump_data_version
 )
 
 from .cli import main
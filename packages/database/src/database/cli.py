@@ -1,9 +1,16 @@
 from argparse import ArgumentParser, Namespace
-from database import create_database, enable_debug
+from database import connect_database, create_database, enable_debug
+from database.migrations import migrate_database
 
 
 def parse_args() -> Namespace:
     parser = ArgumentParser()
+    parser.add_argument(
+        '--migrate',
+        action='store_true',
+        dest='migrate',
+        help='Migrate the schema of an existing database'
+    )
     parser.add_argument(
         '-D', '--debug',
         action='store_true',
@@ -17,4 +24,15 @@ def main():
     if args.debug:
         enable_debug()
 
+    # Existing tables are altered before new tables and indexes are created
+    if args.migrate:
+        database = connect_database()
+        migrations = migrate_database(database)
+        for migration in migrations:
+            print(f'Applied {migration}')
+
+        # Rebuilt tables leave free pages behind
+        if len(migrations) > 0:
+            database.execute_sql('VACUUM')
+
     create_database()
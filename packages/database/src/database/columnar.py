@@ -0,0 +1,195 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from pathlib import Path
+
+DEFAULT_COLUMNAR_STORE = 'app.columnar'
+
+STOCK_DAILY = 'stock_daily'
+CURRENCY_DAILY = 'currency_daily'
+
+STOCK_DAILY_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+CURRENCY_DAILY_COLUMNS = ['date', 'open', 'high', 'low', 'close']
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as error:
+        raise ImportError(
+            'The columnar market data store requires `pyarrow`.'
+        ) from error
+    return pyarrow
+
+
+def _to_day(value: date | datetime) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+def currency_pair_key(from_code: str, to_code: str) -> str:
+    return f'{from_code}-{to_code}'
+
+
+class ColumnarStore:
+    '''Daily bars as memory-mappable Arrow IPC files, one per ticker and
+    year, so appending a bar only rewrites the file of its year.'''
+
+    def __init__(self, root: str | Path = DEFAULT_COLUMNAR_STORE):
+        self.root = Path(root)
+
+    def exists(self) -> bool:
+        return self.root.is_dir()
+
+    def path(self, dataset: str, key: str, year: int | None = None) -> Path:
+        # Stores written before the yearly files kept one file per ticker
+        if year is None:
+            return self.root / dataset / f'{key}.arrow'
+        return self.root / dataset / key / f'{year}.arrow'
+
+    def years(self, dataset: str, key: str) -> list[int]:
+        directory = self.root / dataset / key
+        if not directory.is_dir():
+            return []
+        return sorted(int(path.stem) for path in directory.glob('*.arrow'))
+
+    def has(self, dataset: str, key: str) -> bool:
+        return len(self.years(dataset, key)) > 0 \
+            or self.path(dataset, key).is_file()
+
+    def _read_table(self, path: Path):
+        pa = _import_pyarrow()
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_table(self, path: Path, data: pd.DataFrame):
+        pa = _import_pyarrow()
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        table = table.set_column(
+            0,
+            'date',
+            table['date'].cast(pa.date32())
+        ).combine_chunks()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix('.arrow.tmp')
+        with pa.OSFile(str(temp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+
+    def _to_frame(self, table) -> pd.DataFrame:
+        # Dates convert in one cast instead of one `date` object per row
+        return table.to_pandas(
+            date_as_object=False,
+            coerce_temporal_nanoseconds=True
+        )
+
+    def write(
+            self,
+            dataset: str,
+            key: str,
+            data: pd.DataFrame,
+            columns: list[str]
+            ):
+        data = data[columns].assign(
+            date=lambda df: pd.to_datetime(df['date']).dt.normalize()
+        )
+
+        # A single-file ticker is split into yearly files on its next write
+        legacy_path = self.path(dataset, key)
+        if legacy_path.is_file():
+            data = pd.concat([
+                self._to_frame(self._read_table(legacy_path)),
+                data
+            ])
+
+        for year, year_data in data.groupby(data['date'].dt.year):
+            path = self.path(dataset, key, year)
+            if path.is_file():
+                # Like the SQLite loaders, bars already stored are kept
+                year_data = pd.concat([
+                    self._to_frame(self._read_table(path)),
+                    year_data
+                ])
+            self._write_table(
+                path,
+                year_data
+                .drop_duplicates('date', keep='first')
+                .sort_values('date')
+            )
+
+        if legacy_path.is_file():
+            legacy_path.unlink()
+
+    def read_one(
+            self,
+            dataset: str,
+            key: str,
+            start_date: date | datetime | None = None,
+            end_date: date | datetime | None = None
+            ) -> pd.DataFrame:
+        pa = _import_pyarrow()
+
+        legacy_path = self.path(dataset, key)
+        if legacy_path.is_file():
+            paths = [legacy_path]
+        else:
+            paths = [
+                self.path(dataset, key, year)
+                for year in self.years(dataset, key)
+                if (start_date is None or year >= start_date.year)
+                and (end_date is None or year <= end_date.year)
+            ]
+        if len(paths) == 0:
+            return pd.DataFrame(columns=['date'])
+
+        # Files are sorted by date, so a range is a zero-copy slice of the
+        # memory-mapped columns and only the selected rows get converted
+        tables = []
+        for path in paths:
+            table = self._read_table(path)
+            dates = table['date'].to_numpy()
+            start = 0 if start_date is None \
+                else dates.searchsorted(_to_day(start_date))
+            end = len(dates) if end_date is None \
+                else dates.searchsorted(_to_day(end_date), side='right')
+            tables.append(table.slice(start, end - start))
+        return self._to_frame(pa.concat_tables(tables))
+
+    def read(
+            self,
+            dataset: str,
+            keys: list[str],
+            start_date: date | datetime | None = None,
+            end_date: date | datetime | None = None,
+            *,
+            key_column: str = 'key'
+            ) -> pd.DataFrame:
+        data = [
+            self.read_one(dataset, key, start_date, end_date)
+            .assign(**{key_column: key})
+            for key in keys
+            if self.has(dataset, key)
+        ]
+        if len(data) == 0:
+            return pd.DataFrame()
+        return pd.concat(data, ignore_index=True)
+
+
+def get_columnar_store(
+        root: str | Path = DEFAULT_COLUMNAR_STORE
+        ) -> ColumnarStore | None:
+    store = ColumnarStore(root)
+    if not store.exists():
+        return None
+
+    try:
+        _import_pyarrow()
+    except ImportError:
+        return None
+    return store
@@ -1,18 +1,56 @@
+import threading
+from numbers import Integral
+from datetime import date, datetime, timedelta
 from peewee import (
     Model as DBModel,
     AutoField,
     BooleanField,
     CharField,
+    CompositeKey,
     DateField,
     DateTimeField,
     IntegerField,
     BigIntegerField,
+    SmallIntegerField,
     FloatField,
     ForeignKeyField,
     TextField,
     SQL,
     SqliteDatabase
 )
+from playhouse.pool import PooledSqliteDatabase
+
+DEFAULT_DATABASE = 'app.db'
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64_000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+POOL_MAX_CONNECTIONS = 32
+POOL_STALE_TIMEOUT = 300
+
+
+EPOCH = date(1970, 1, 1)
+
+
+class EpochDayField(IntegerField):
+    '''Date stored as an integer count of days since 1970-01-01.'''
+
+    def db_value(self, value):
+        if value is None or isinstance(value, Integral):
+            return value
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        elif isinstance(value, datetime):
+            value = value.date()
+        return (value - EPOCH).days
+
+    def python_value(self, value):
+        if value is None:
+            return value
+        return EPOCH + timedelta(days=value)
 
 
 def enable_debug():
@@ -68,31 +106,86 @@ class Stock(DBModel):
         Sector,
         Sector.code,
         column_name='sector_code',
-        backref='stocks'
+        backref='stocks',
+        index=False
     )
 
+    class Meta:
+        # Covers the sector aggregates, which walk stocks by sector
+        indexes = ((('sector_code', 'code', 'volume'), False),)
+
 
 class StockDaily(DBModel):
-    id = AutoField()
+    # Bars are clustered by their natural key, so a ticker's date range is
+    # one contiguous walk of the primary key b-tree
     stock = ForeignKeyField(
         Stock,
         Stock.code,
         column_name='stock_code',
-        backref='daily_history'
+        backref='daily_history',
+        index=False
     )
-    date = DateField()
+    date = EpochDayField()
     open = FloatField()
     high = FloatField()
     low = FloatField()
     close = FloatField()
     volume = BigIntegerField()
-    created_datetime = DateTimeField(
+    created_datetime = DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'stock_price_daily'
+        primary_key = CompositeKey('stock', 'date')
+        without_rowid = True
+
+
+class SectorIndexDaily(DBModel):
+    id = AutoField()
+    sector = ForeignKeyField(
+        Sector,
+        Sector.code,
+        column_name='sector_code',
+        backref='daily_index'
+    )
+    date = DateField()
+    close = FloatField()
+    modified_datetime = DateTimeField(
         constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
     )
 
     class Meta:
-        db_table = 'stock_price_daily'
-        indexes = ((('stock_code', 'date'), True),)
+        db_table = 'sector_index_daily'
+        indexes = (
+            (('sector_code', 'date'), True),
+            # Latest date across sectors for the load watermark
+            (('date', ), False),
+        )
+
+
+class ReturnsDaily(DBModel):
+    STOCK = 'stock'
+    SECTOR = 'sector'
+    CURRENCY = 'currency'
+
+    id = AutoField()
+    asset_type = CharField()
+    asset_code = CharField()
+    date = DateField()
+    change_1d = FloatField(null=True)
+    change_7d = FloatField(null=True)
+    change_30d = FloatField(null=True)
+    change_60d = FloatField(null=True)
+    modified_datetime = DateTimeField(
+        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
+    )
+
+    class Meta:
+        db_table = 'returns_daily'
+        indexes = (
+            (('asset_type', 'asset_code', 'date'), True),
+            # Latest date across assets for the load watermark
+            (('date', ), False),
+        )
 
 
 class Currency(DBModel):
@@ -101,29 +194,29 @@ class Currency(DBModel):
 
 
 class CurrencyDaily(DBModel):
-    id = AutoField()
     from_currency = ForeignKeyField(
         Currency,
         Currency.code,
-        column_name='from_currency_code'
+        column_name='from_currency_code',
+        index=False
     )
     to_currency = ForeignKeyField(
         Currency,
         Currency.code,
-        column_name='to_currency_code'
+        column_name='to_currency_code',
+        index=False
     )
-    date = DateField()
+    date = EpochDayField()
     open = FloatField()
     high = FloatField()
     low = FloatField()
     close = FloatField()
-    created_datetime = DateTimeField(
-        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
-    )
+    created_datetime = DateTimeField(null=True)
 
     class Meta:
         db_table = 'currency_daily'
-        indexes = ((('from_currency_code', 'to_currency_code', 'date'), True),)
+        primary_key = CompositeKey('from_currency', 'to_currency', 'date')
+        without_rowid = True
 
 
 class UserStockTrade(DBModel):
@@ -184,6 +277,23 @@ class Strategy(DBModel):
 
 
 class StrategyEvaluation(DBModel):
+    SIGNAL_LABELS = ('Hold', 'Buy', 'Sell')
+    METRICS = (
+        'window',
+        'lower_threshold',
+        'upper_threshold',
+        'current_price',
+        'upper_band',
+        'lower_band',
+        'bandwidth',
+        'bandwidth_change',
+        'rolling_max',
+        'rolling_min',
+        'rolling_range',
+        'rsi',
+        'rsi_shifted',
+    )
+
     id = AutoField()
     strategy = ForeignKeyField(
         Strategy,
@@ -195,14 +305,125 @@ class StrategyEvaluation(DBModel):
         column_name='stock_code'
     )
     date = DateField()
-    evaluation = TextField()
+    # Index of `SIGNAL_LABELS`, metrics a strategy does not have are NULL
+    signal = SmallIntegerField(default=0)
+    window = IntegerField(null=True)
+    lower_threshold = IntegerField(null=True)
+    upper_threshold = IntegerField(null=True)
+    current_price = FloatField(null=True)
+    upper_band = FloatField(null=True)
+    lower_band = FloatField(null=True)
+    bandwidth = FloatField(null=True)
+    bandwidth_change = FloatField(null=True)
+    rolling_max = FloatField(null=True)
+    rolling_min = FloatField(null=True)
+    rolling_range = FloatField(null=True)
+    rsi = FloatField(null=True)
+    rsi_shifted = FloatField(null=True)
     created_datetime = DateTimeField(
         constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
     )
 
     class Meta:
         db_table = 'strategy_evaluation'
-        indexes = ((('strategy_id', 'stock_code', 'date'), True),)
+        indexes = (
+            (('strategy_id', 'stock_code', 'date'), True),
+            (('date', 'strategy_id', 'signal'), False),
+        )
+
+
+class IndicatorState(DBModel):
+    id = AutoField()
+    strategy = ForeignKeyField(
+        Strategy,
+        column_name='strategy_id'
+    )
+    stock = ForeignKeyField(
+        Stock,
+        Stock.code,
+        column_name='stock_code'
+    )
+    date = DateField()
+    bar_count = IntegerField()
+    state = TextField()
+    modified_datetime = DateTimeField(
+        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
+    )
+
+    class Meta:
+        db_table = 'indicator_state'
+        indexes = ((('strategy_id', 'stock_code'), True),)
+
+
+class DataVersion(DBModel):
+    MARKET = 'market'
+
+    name = CharField(primary_key=True)
+    version = IntegerField(default=0)
+    modified_datetime = DateTimeField(
+        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
+    )
+
+    class Meta:
+        db_table = 'data_version'
+
+
+class TradingHoliday(DBModel):
+    IDX = 'IDX'
+
+    id = AutoField()
+    exchange = CharField(default=IDX)
+    date = DateField()
+    name = CharField()
+
+    class Meta:
+        db_table = 'trading_holiday'
+        indexes = ((('exchange', 'date'), True),)
+
+
+class PipelineCheckpoint(DBModel):
+    STOCK = 'stock'
+    CURRENCY = 'currency'
+
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = AutoField()
+    run_date = DateField()
+    unit_type = CharField()
+    unit_code = CharField()
+    status = CharField(default=PENDING)
+    rows_loaded = IntegerField(default=0)
+    last_error = TextField(null=True)
+    attempt_count = IntegerField(default=0)
+    modified_datetime = DateTimeField(
+        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
+    )
+
+    class Meta:
+        db_table = 'pipeline_checkpoint'
+        indexes = ((('run_date', 'unit_type', 'unit_code'), True),)
+
+
+class EmptyFetchRange(DBModel):
+    # Trading days a unit was fetched for but Yahoo had no bar, like the
+    # days an illiquid stock did not trade, so they are not planned again
+    # until the record expires
+    id = AutoField()
+    unit_type = CharField()
+    unit_code = CharField()
+    start_date = DateField()
+    end_date = DateField()
+    created_datetime = DateTimeField(
+        constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')]
+    )
+
+    class Meta:
+        db_table = 'empty_fetch_range'
+        indexes = (
+            (('unit_type', 'unit_code', 'start_date', 'end_date'), True),
+        )
 
 
 db_models = [
@@ -211,31 +432,96 @@ db_models = [
     Sector,
     Stock,
     StockDaily,
+    SectorIndexDaily,
+    ReturnsDaily,
     Currency,
     CurrencyDaily,
     UserStockTrade,
     UserStockWatchlist,
     Strategy,
-    StrategyEvaluation
+    StrategyEvaluation,
+    IndicatorState,
+    DataVersion,
+    TradingHoliday,
+    PipelineCheckpoint,
+    EmptyFetchRange
 ]
 
 
-def _get_database(database: str | None = None) -> SqliteDatabase:
-    if database is None:
-        database = SqliteDatabase('app.db')
-    else:
-        database = SqliteDatabase(database)
-    return database
+_databases: dict[tuple[str, bool], SqliteDatabase] = {}
+_databases_lock = threading.Lock()
 
 
-def connect_database(database: str | None = None) -> SqliteDatabase:
-    database = _get_database(database)
-    database.bind(db_models)
+def _get_database(
+        database: str | None = None,
+        *,
+        pooled: bool = False
+        ) -> SqliteDatabase:
+    if database is None:
+        database = DEFAULT_DATABASE
+
+    key = (database, pooled)
+    with _databases_lock:
+        if key not in _databases:
+            if pooled:
+                _databases[key] = PooledSqliteDatabase(
+                    database,
+                    pragmas=DEFAULT_PRAGMAS,
+                    max_connections=POOL_MAX_CONNECTIONS,
+                    stale_timeout=POOL_STALE_TIMEOUT,
+                    check_same_thread=False
+                )
+            else:
+                _databases[key] = SqliteDatabase(
+                    database,
+                    pragmas=DEFAULT_PRAGMAS
+                )
+        return _databases[key]
+
+
+def connect_database(
+        database: str | None = None,
+        *,
+        pooled: bool = False
+        ) -> SqliteDatabase:
+    database = _get_database(database, pooled=pooled)
+    if any(model._meta.database is not database for model in db_models):
+        database.bind(db_models)
     return database
 
 
-def create_database(database: str | None = None) -> SqliteDatabase:
-    database = _get_database(database)
-    database.bind(db_models)
+def create_database(
+        database: str | None = None,
+        *,
+        pooled: bool = False
+        ) -> SqliteDatabase:
+    database = connect_database(database, pooled=pooled)
     database.create_tables(db_models)
     return database
+
+
+def get_data_version(name: str = DataVersion.MARKET) -> int:
+    version = (
+        DataVersion
+        .select(DataVersion.version)
+        .where(DataVersion.name == name)
+        .scalar()
+    )
+    return version or 0
+
+
+def bump_data_version(name: str = DataVersion.MARKET) -> int:
+    # Lets other processes, like the agent tools, notice that data changed
+    (
+        DataVersion
+        .insert(name=name, version=1)
+        .on_conflict(
+            conflict_target=[DataVersion.name],
+            update={
+                DataVersion.version: DataVersion.version + 1,
+                DataVersion.modified_datetime: SQL('CURRENT_TIMESTAMP'),
+            }
+        )
+        .execute()
+    )
+    return get_data_version(name)
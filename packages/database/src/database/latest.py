@@ -0,0 +1,100 @@
+from datetime import date, datetime, timedelta
+from peewee import Select, fn
+
+from .database import ReturnsDaily, Strategy, StrategyEvaluation
+from .plans import register_hot_query
+
+
+def latest_returns_query(
+        asset_type: str,
+        asset_codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime
+        ) -> Select:
+    '''Returns of the latest date from `start_date` to `end_date` of each
+    asset.'''
+    # The latest date is looked up per row in the window, an index seek
+    # each, instead of grouping the window into a materialized table
+    Latest = ReturnsDaily.alias()
+    latest_date = (
+        Latest
+        .select(fn.MAX(Latest.date))
+        .where(
+            (Latest.asset_type == ReturnsDaily.asset_type)
+            & (Latest.asset_code == ReturnsDaily.asset_code)
+            & (Latest.date >= start_date)
+            & (Latest.date <= end_date)
+        )
+    )
+    return (
+        ReturnsDaily
+        .select()
+        .where(
+            (ReturnsDaily.asset_type == asset_type)
+            & ReturnsDaily.asset_code.in_(asset_codes)
+            & (ReturnsDaily.date >= start_date)
+            & (ReturnsDaily.date <= end_date)
+            & (ReturnsDaily.date == latest_date)
+        )
+    )
+
+
+def latest_evaluations_query(
+        stock_codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime
+        ) -> Select:
+    '''Evaluation of the latest date from `start_date` to `end_date` of each
+    strategy and stock, ordered by strategy.'''
+    Latest = StrategyEvaluation.alias()
+    latest_date = (
+        Latest
+        .select(fn.MAX(Latest.date))
+        .where(
+            (Latest.strategy_id == StrategyEvaluation.strategy_id)
+            & (Latest.stock_code == StrategyEvaluation.stock_code)
+            & (Latest.date >= start_date)
+            & (Latest.date <= end_date)
+        )
+    )
+    return (
+        StrategyEvaluation
+        .select(StrategyEvaluation, Strategy.name)
+        .join(Strategy)
+        .where(
+            StrategyEvaluation.stock_code.in_(stock_codes)
+            & (StrategyEvaluation.date >= start_date)
+            & (StrategyEvaluation.date <= end_date)
+            & (StrategyEvaluation.date == latest_date)
+        )
+        # The index order, stocks keep their strategies in this order
+        .order_by(StrategyEvaluation.strategy_id, StrategyEvaluation.stock_code)
+    )
+
+
+register_hot_query(
+    'latest_returns',
+    lambda: latest_returns_query(
+        ReturnsDaily.STOCK,
+        ['S0000.JK', 'S0001.JK'],
+        date.today() - timedelta(days=7),
+        date.today()
+    )
+)
+register_hot_query(
+    'latest_sector_returns',
+    lambda: latest_returns_query(
+        ReturnsDaily.SECTOR,
+        ['SECTOR00'],
+        date.today() - timedelta(days=7),
+        date.today()
+    )
+)
+register_hot_query(
+    'latest_strategy_evaluations',
+    lambda: latest_evaluations_query(
+        ['S0000.JK', 'S0001.JK'],
+        date.today() - timedelta(days=7),
+        date.today()
+    )
+)
@@ -0,0 +1,124 @@
+from peewee import (
+    Database,
+    FloatField,
+    IntegerField,
+    Model,
+    SmallIntegerField
+)
+from playhouse.migrate import SqliteMigrator, migrate
+
+from .database import (
+    CurrencyDaily,
+    EpochDayField,
+    StockDaily,
+    StrategyEvaluation
+)
+
+
+def _get_columns(database: Database, table: str) -> set[str]:
+    return {column.name for column in database.get_columns(table)}
+
+
+def migrate_strategy_evaluation_columns(database: Database) -> bool:
+    '''Move the JSON `evaluation` of strategy_evaluation into typed columns.'''
+    table = StrategyEvaluation._meta.table_name
+    if 'evaluation' not in _get_columns(database, table):
+        return False
+
+    fields = {'signal': SmallIntegerField(default=0)}
+    for name in StrategyEvaluation.METRICS:
+        field = StrategyEvaluation._meta.fields[name]
+        fields[name] = (
+            IntegerField(null=True)
+            if isinstance(field, IntegerField)
+            else FloatField(null=True)
+        )
+
+    # json.dumps wrote NaN and Infinity, which SQLite's JSON parser rejects
+    evaluation = (
+        "replace(replace(evaluation, 'NaN', 'null'), 'Infinity', '1e999')"
+    )
+    signal = ' '.join(
+        f"WHEN '{label}' THEN {code}"
+        for code, label in enumerate(StrategyEvaluation.SIGNAL_LABELS)
+    )
+    assignments = ', '.join(
+        [f"signal = CASE json_extract({evaluation}, '$.signal') "
+         f'{signal} ELSE 0 END']
+        + [
+            f'"{name}" = json_extract({evaluation}, \'$.{name}\')'
+            for name in StrategyEvaluation.METRICS
+        ]
+    )
+
+    migrator = SqliteMigrator(database)
+    with database.atomic():
+        migrate(*(
+            migrator.add_column(table, name, field)
+            for name, field in fields.items()
+        ))
+        database.execute_sql(f'UPDATE "{table}" SET {assignments}')
+        migrate(migrator.drop_column(table, 'evaluation'))
+    return True
+
+
+def _rebuild_daily_table(database: Database, model: type[Model]) -> bool:
+    table = model._meta.table_name
+    old_columns = _get_columns(database, table)
+    if 'id' not in old_columns:
+        return False
+
+    fields = [
+        field
+        for field in model._meta.sorted_fields
+        if field.column_name in old_columns
+    ]
+    columns = ', '.join(f'"{field.column_name}"' for field in fields)
+    values = ', '.join(
+        f'CAST(julianday("{field.column_name}") - 2440587.5 AS INTEGER)'
+        if isinstance(field, EpochDayField)
+        else f'"{field.column_name}"'
+        for field in fields
+    )
+    keys = ', '.join(
+        f'"{model._meta.fields[name].column_name}"'
+        for name in model._meta.primary_key.field_names
+    )
+
+    old_table = f'{table}_old'
+    with database.atomic():
+        database.execute_sql(f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+        # Index names are global, the new table creates them again
+        for index in database.get_indexes(old_table):
+            database.execute_sql(f'DROP INDEX "{index.name}"')
+        model.create_table()
+        # Rows are copied in primary key order so the new b-tree is packed
+        database.execute_sql(
+            f'INSERT OR IGNORE INTO "{table}" ({columns}) '
+            f'SELECT {values} FROM "{old_table}" ORDER BY {keys}'
+        )
+        database.execute_sql(f'DROP TABLE "{old_table}"')
+    return True
+
+
+def migrate_daily_price_tables(database: Database) -> bool:
+    '''Rebuild the daily price tables WITHOUT ROWID keyed by epoch day.'''
+    return any([
+        _rebuild_daily_table(database, StockDaily),
+        _rebuild_daily_table(database, CurrencyDaily),
+    ])
+
+
+MIGRATIONS = [
+    migrate_strategy_evaluation_columns,
+    migrate_daily_price_tables,
+]
+
+
+def migrate_database(database: Database) -> list[str]:
+    '''Run the pending schema migrations, returning the names applied.'''
+    return [
+        migration.__name__
+        for migration in MIGRATIONS
+        if migration(database)
+    ]
@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+from peewee import Query, SqliteDatabase
+from typing import Callable
+
+from .database import (
+    db_models,
+    EPOCH,
+    Currency,
+    CurrencyDaily,
+    ReturnsDaily,
+    Sector,
+    SectorIndexDaily,
+    Stock,
+    StockDaily,
+    Strategy,
+    StrategyEvaluation
+)
+
+# Hot queries registered by name, each with the plan details it may keep
+HOT_QUERIES: dict[
+    str,
+    tuple[Callable[[], Query | tuple[str, list]], tuple[str, ...]]
+] = {}
+
+
+def register_hot_query(
+        name: str,
+        build: Callable[[], Query | tuple[str, list]],
+        allow: tuple[str, ...] = ()
+        ):
+    '''Register a query whose plan must not scan tables or sort in temp
+    b-trees. `allow` lists substrings of plan details that are accepted.'''
+    HOT_QUERIES[name] = (build, allow)
+
+
+def explain_query_plan(
+        database: SqliteDatabase,
+        sql: str,
+        params: list | tuple = ()
+        ) -> list[str]:
+    return [
+        detail
+        for *_, detail in database.execute_sql(
+            f'EXPLAIN QUERY PLAN {sql}',
+            params
+        ).fetchall()
+    ]
+
+
+def find_plan_problems(
+        plan: list[str],
+        allow: tuple[str, ...] = ()
+        ) -> list[str]:
+    # SQLite reports a scan without an index as "SEARCH t" for MIN/MAX
+    return [
+        detail
+        for detail in plan
+        if (
+            detail.startswith('SCAN ')
+            or (detail.startswith('SEARCH ') and ' USING ' not in detail)
+            or 'TEMP B-TREE' in detail
+        )
+        and not any(pattern in detail for pattern in allow)
+    ]
+
+
+def create_synthetic_database(
+        n_stocks: int = 200,
+        n_days: int = 500,
+        n_sectors: int = 10
+        ) -> SqliteDatabase:
+    '''In-memory database with the current schema, sized so ANALYZE gives
+    the planner statistics shaped like production.'''
+    database = SqliteDatabase(':memory:')
+    sectors = [f'SECTOR{i:02d}' for i in range(n_sectors)]
+    stocks = [f'S{i:04d}.JK' for i in range(n_stocks)]
+    end = date.today()
+    days = [
+        (end - timedelta(days=offset) - EPOCH).days
+        for offset in range(n_days)
+    ]
+
+    with database.bind_ctx(db_models):
+        database.create_tables(db_models)
+        with database.atomic():
+            Sector.insert_many(
+                [(code, code) for code in sectors],
+                [Sector.code, Sector.name]
+            ).execute()
+            Stock.insert_many(
+                [
+                    (code, code, (i + 1) * 1000, sectors[i % n_sectors])
+                    for i, code in enumerate(stocks)
+                ],
+                [Stock.code, Stock.name, Stock.volume, Stock.sector]
+            ).execute()
+            Currency.insert_many(
+                [('USD', 'USD'), ('IDR', 'IDR')],
+                [Currency.code, Currency.name]
+            ).execute()
+
+            cursor = database.cursor()
+            cursor.executemany(
+                f'INSERT INTO "{StockDaily._meta.table_name}" '
+                '(stock_code, date, open, high, low, close, volume) '
+                'VALUES (?, ?, 1, 1, 1, 1, 1)',
+                [(code, day) for code in stocks for day in days]
+            )
+            cursor.executemany(
+                f'INSERT INTO "{CurrencyDaily._meta.table_name}" '
+                '(from_currency_code, to_currency_code, date, '
+                'open, high, low, close) '
+                "VALUES ('USD', 'IDR', ?, 1, 1, 1, 1)",
+                [(day, ) for day in days]
+            )
+            cursor.executemany(
+                f'INSERT INTO "{SectorIndexDaily._meta.table_name}" '
+                '(sector_code, date, close) '
+                "VALUES (?, date(? * 86400, 'unixepoch'), 1)",
+                [(code, day) for code in sectors for day in days]
+            )
+            cursor.executemany(
+                f'INSERT INTO "{ReturnsDaily._meta.table_name}" '
+                '(asset_type, asset_code, date) '
+                "VALUES (?, ?, date(? * 86400, 'unixepoch'))",
+                [
+                    (asset_type, code, day)
+                    for asset_type, codes in (
+                        (ReturnsDaily.STOCK, stocks),
+                        (ReturnsDaily.SECTOR, sectors),
+                    )
+                    for code in codes
+                    for day in days
+                ]
+            )
+            Strategy.insert_many(
+                [(1, 'Bollinger Bands'), (2, 'Donchian Channel')],
+                [Strategy.id, Strategy.name]
+            ).execute()
+            cursor.executemany(
+                f'INSERT INTO "{StrategyEvaluation._meta.table_name}" '
+                '(strategy_id, stock_code, date, signal) '
+                "VALUES (?, ?, date(? * 86400, 'unixepoch'), 0)",
+                [
+                    (strategy_id, code, day)
+                    for strategy_id in (1, 2)
+                    for code in stocks
+                    for day in days
+                ]
+            )
+        database.execute_sql('ANALYZE')
+    return database
+
+
+def check_query_plans(
+        database: SqliteDatabase | None = None
+        ) -> dict[str, list[str]]:
+    '''Plan details of every hot query that scan a table or use a temp
+    b-tree, keyed by query name.'''
+    if database is None:
+        database = create_synthetic_database()
+
+    problems = {}
+    with database.bind_ctx(db_models):
+        for name, (build, allow) in HOT_QUERIES.items():
+            query = build()
+            if isinstance(query, Query):
+                query = query.sql()
+            problems[name] = find_plan_problems(
+                explain_query_plan(database, *query),
+                allow
+            )
+    return problems
@@ -0,0 +1,387 @@
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from peewee import Database
+
+from .database import StockDaily, CurrencyDaily, SectorIndexDaily
+from .plans import register_hot_query
+
+STOCK_DAILY_DTYPE = np.dtype([
+    ('date', np.int32),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.int64),
+])
+CURRENCY_DAILY_DTYPE = np.dtype([
+    ('date', np.int32),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+])
+
+SECTOR_INDEX_DAILY_DTYPE = np.dtype([
+    ('date', np.int32),
+    ('close', np.float64),
+])
+
+
+def _to_date_param(value: date | datetime) -> int:
+    # Daily bars store dates as days since the epoch
+    return StockDaily.date.db_value(value)
+
+
+def _to_iso_date_param(value: date | datetime) -> str:
+    # Sector indices store ISO dates, a time part would break the range
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def _fetch_array(
+        database: Database,
+        sql: str,
+        params: list,
+        dtype: np.dtype
+        ) -> np.ndarray:
+    # Counting first lets the rows stream straight into one typed array.
+    # Both statements run in one read transaction, so a load committing
+    # between them cannot change the rows the count was taken for.
+    with database.atomic():
+        (count, ), = database.execute_sql(
+            f'SELECT COUNT(*) FROM ({sql})',
+            params
+        ).fetchall()
+        return np.fromiter(
+            database.execute_sql(sql, params),
+            dtype=dtype,
+            count=count
+        )
+
+
+def _to_frame(records: np.ndarray, columns: list[str]) -> pd.DataFrame:
+    data = pd.DataFrame({column: records[column] for column in columns})
+    data['date'] = records['date'].astype('datetime64[D]') \
+        .astype('datetime64[ns]')
+    return data
+
+
+def _stock_daily_sql(
+        codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime,
+        columns: str = 'date, open, high, low, close, volume',
+        order: str = 'ORDER BY stock_code, date'
+        ) -> tuple[str, list]:
+    # An IN list walks the primary key in order, a joined list would not
+    values = ', '.join(['?'] * len(codes))
+    sql = (
+        f'SELECT {columns} FROM {StockDaily._meta.table_name} '
+        f'WHERE stock_code IN ({values}) AND date >= ? AND date <= ? '
+        f'{order}'
+    )
+    params = [
+        *codes,
+        _to_date_param(start_date),
+        _to_date_param(end_date),
+    ]
+    return sql, params
+
+
+def _count_stock_daily(
+        database: Database,
+        codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime
+        ) -> dict[str, int]:
+    return dict(database.execute_sql(*_stock_daily_sql(
+        codes,
+        start_date,
+        end_date,
+        columns='stock_code, COUNT(*)',
+        order='GROUP BY stock_code ORDER BY stock_code'
+    )).fetchall())
+
+
+def read_stock_daily(
+        stock_codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime,
+        *,
+        database: Database | None = None
+        ) -> pd.DataFrame:
+    '''Daily bars of `stock_codes` sorted by stock and date.
+
+    Rows are read with raw SQL into typed NumPy arrays, so no Python object
+    is created per row. `stock_code` is returned as a categorical.
+    '''
+    if database is None:
+        database = StockDaily._meta.database
+
+    codes = sorted(set(stock_codes))
+    if len(codes) == 0:
+        records = np.empty(0, dtype=STOCK_DAILY_DTYPE)
+        counts = {}
+    else:
+        # Stock codes are counted per stock, then decoded once at the end,
+        # in one read transaction like `_fetch_array`
+        with database.atomic():
+            counts = _count_stock_daily(
+                database,
+                codes,
+                start_date,
+                end_date
+            )
+            records = np.fromiter(
+                database.execute_sql(*_stock_daily_sql(
+                    codes,
+                    start_date,
+                    end_date
+                )),
+                dtype=STOCK_DAILY_DTYPE,
+                count=sum(counts.values())
+            )
+
+    data = _to_frame(
+        records,
+        ['date', 'open', 'high', 'low', 'close', 'volume']
+    )
+    data.insert(
+        0,
+        'stock_code',
+        pd.Categorical.from_codes(
+            np.repeat(
+                np.arange(len(codes)),
+                [counts.get(code, 0) for code in codes]
+            ),
+            categories=codes
+        )
+    )
+    return data
+
+
+def read_stock_dates(
+        stock_codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime,
+        *,
+        database: Database | None = None
+        ) -> dict[str, np.ndarray]:
+    '''Sorted `datetime64[D]` dates of the daily bars of each stock.'''
+    if database is None:
+        database = StockDaily._meta.database
+
+    codes = sorted(set(stock_codes))
+    if len(codes) == 0:
+        return {}
+
+    with database.atomic():
+        counts = _count_stock_daily(database, codes, start_date, end_date)
+        dates = np.fromiter(
+            (
+                day
+                for day, in database.execute_sql(*_stock_daily_sql(
+                    codes,
+                    start_date,
+                    end_date,
+                    columns='date'
+                ))
+            ),
+            dtype=np.int32,
+            count=sum(counts.values())
+        ).astype('datetime64[D]')
+    return dict(zip(
+        counts,
+        np.split(dates, np.cumsum(list(counts.values()))[:-1])
+    ))
+
+
+def read_stock_open_days(
+        start_date: date | datetime,
+        end_date: date | datetime,
+        *,
+        database: Database | None = None
+        ) -> np.ndarray:
+    '''Sorted `datetime64[D]` dates any stock has a daily bar on.'''
+    if database is None:
+        database = StockDaily._meta.database
+
+    return np.fromiter(
+        (
+            day
+            for day, in database.execute_sql(
+                'SELECT DISTINCT date '
+                f'FROM {StockDaily._meta.table_name} '
+                'WHERE date >= ? AND date <= ? '
+                'ORDER BY date',
+                [_to_date_param(start_date), _to_date_param(end_date)]
+            )
+        ),
+        dtype=np.int32
+    ).astype('datetime64[D]')
+
+
+def _sector_index_daily_sql(
+        codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime,
+        columns: str = (
+            "CAST(julianday(date) - julianday('1970-01-01') AS INTEGER), "
+            'close'
+        ),
+        order: str = 'ORDER BY sector_code, date'
+        ) -> tuple[str, list]:
+    values = ', '.join(['?'] * len(codes))
+    sql = (
+        f'SELECT {columns} FROM {SectorIndexDaily._meta.table_name} '
+        f'WHERE sector_code IN ({values}) AND date >= ? AND date <= ? '
+        f'{order}'
+    )
+    params = [
+        *codes,
+        _to_iso_date_param(start_date),
+        _to_iso_date_param(end_date),
+    ]
+    return sql, params
+
+
+def read_sector_index_daily(
+        sector_codes: list[str],
+        start_date: date | datetime,
+        end_date: date | datetime,
+        *,
+        database: Database | None = None
+        ) -> pd.DataFrame:
+    '''Daily indices of `sector_codes` sorted by sector and date, read like
+    `read_stock_daily`. `sector_code` is returned as a categorical.'''
+    if database is None:
+        database = SectorIndexDaily._meta.database
+
+    codes = sorted(set(sector_codes))
+    counts = {}
+    records = np.empty(0, dtype=SECTOR_INDEX_DAILY_DTYPE)
+    if len(codes) > 0:
+        with database.atomic():
+            counts = dict(database.execute_sql(*_sector_index_daily_sql(
+                codes,
+                start_date,
+                end_date,
+                columns='sector_code, COUNT(*)',
+                order='GROUP BY sector_code ORDER BY sector_code'
+            )).fetchall())
+            records = np.fromiter(
+                database.execute_sql(*_sector_index_daily_sql(
+                    codes,
+                    start_date,
+                    end_date
+                )),
+                dtype=SECTOR_INDEX_DAILY_DTYPE,
+                count=sum(counts.values())
+            )
+
+    data = _to_frame(records, ['date', 'close'])
+    data.insert(
+        0,
+        'sector_code',
+        pd.Categorical.from_codes(
+            np.repeat(
+                np.arange(len(codes)),
+                [counts.get(code, 0) for code in codes]
+            ),
+            categories=codes
+        )
+    )
+    return data
+
+
+def _currency_daily_sql(
+        from_currency_code: str,
+        to_currency_code: str,
+        start_date: date | datetime,
+        end_date: date | datetime
+        ) -> tuple[str, list]:
+    sql = (
+        'SELECT date, open, high, low, close '
+        f'FROM {CurrencyDaily._meta.table_name} '
+        'WHERE from_currency_code = ? AND to_currency_code = ? '
+        'AND date >= ? AND date <= ? '
+        'ORDER BY date'
+    )
+    params = [
+        from_currency_code,
+        to_currency_code,
+        _to_date_param(start_date),
+        _to_date_param(end_date),
+    ]
+    return sql, params
+
+
+def read_currency_daily(
+        from_currency_code: str,
+        to_currency_code: str,
+        start_date: date | datetime,
+        end_date: date | datetime,
+        *,
+        database: Database | None = None
+        ) -> pd.DataFrame:
+    '''Daily bars of a currency pair sorted by date.'''
+    if database is None:
+        database = CurrencyDaily._meta.database
+
+    sql, params = _currency_daily_sql(
+        from_currency_code,
+        to_currency_code,
+        start_date,
+        end_date
+    )
+    records = _fetch_array(database, sql, params, CURRENCY_DAILY_DTYPE)
+    return _to_frame(records, ['date', 'open', 'high', 'low', 'close'])
+
+
+register_hot_query(
+    'read_stock_daily',
+    lambda: _stock_daily_sql(
+        ['S0000.JK', 'S0001.JK'],
+        date.today() - timedelta(days=365),
+        date.today()
+    )
+)
+register_hot_query(
+    'read_stock_daily_counts',
+    lambda: _stock_daily_sql(
+        ['S0000.JK', 'S0001.JK'],
+        date.today() - timedelta(days=365),
+        date.today(),
+        columns='stock_code, COUNT(*)',
+        order='GROUP BY stock_code ORDER BY stock_code'
+    )
+)
+register_hot_query(
+    'read_currency_daily',
+    lambda: _currency_daily_sql(
+        'USD',
+        'IDR',
+        date.today() - timedelta(days=365),
+        date.today()
+    )
+)
+register_hot_query(
+    'read_sector_index_daily',
+    lambda: _sector_index_daily_sql(
+        ['SECTOR00', 'SECTOR01'],
+        date.today() - timedelta(days=365),
+        date.today()
+    )
+)
+register_hot_query(
+    'read_sector_index_daily_counts',
+    lambda: _sector_index_daily_sql(
+        ['SECTOR00', 'SECTOR01'],
+        date.today() - timedelta(days=365),
+        date.today(),
+        columns='sector_code, COUNT(*)',
+        order='GROUP BY sector_code ORDER BY sector_code'
+    )
+)
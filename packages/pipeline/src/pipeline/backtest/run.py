@@ -0,0 +1,111 @@
+import pandas as pd
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from tqdm import tqdm
+
+from database import StockDaily, connect_database, enable_debug
+
+from pipeline.market.daily import extract_stock_watchlist
+from pipeline.strategy.utils.data import get_stocks_daily_close
+
+from .utils.sweep import run_sweep
+
+
+def extract_universe(universe: str) -> list[str]:
+    if universe == 'watchlist':
+        return [stock.code for stock in extract_stock_watchlist('default')]
+
+    return [
+        stock_code
+        for stock_code, in (
+            StockDaily
+            .select(StockDaily.stock_code)
+            .distinct()
+            .tuples()
+        )
+    ]
+
+
+def run_backtest(
+        close: pd.DataFrame,
+        *,
+        bollinger_windows: list[int],
+        donchian_windows: list[int],
+        rsi_lower_thresholds: list[int],
+        rsi_upper_thresholds: list[int],
+        max_workers: int | None = None
+        ) -> pd.DataFrame:
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                run_sweep,
+                stock_code,
+                close[stock_code].dropna().to_numpy(),
+                bollinger_windows,
+                donchian_windows,
+                rsi_lower_thresholds,
+                rsi_upper_thresholds
+            )
+            for stock_code in close.columns
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            results.append(future.result())
+
+    if len(results) == 0:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+
+def summarize_backtest(results: pd.DataFrame) -> pd.DataFrame:
+    return (
+        results
+        .groupby(['strategy', 'params'])
+        .agg(
+            stocks=('stock_code', 'nunique'),
+            pnl=('pnl', 'mean'),
+            hit_rate=('hit_rate', 'mean'),
+            turnover=('turnover', 'mean'),
+            trades=('trades', 'mean'),
+            exposure=('exposure', 'mean'),
+        )
+        .sort_values(['strategy', 'pnl'], ascending=[True, False])
+    )
+
+
+def run_backtest_pipeline(args: Namespace):
+    if args.debug:
+        enable_debug()
+
+    connect_database()
+
+    stock_codes = extract_universe(args.universe)
+    close = get_stocks_daily_close(
+        stock_codes,
+        start_date=datetime.min if args.start_date is None
+            else datetime.fromisoformat(args.start_date),
+        end_date=None if args.end_date is None
+            else datetime.fromisoformat(args.end_date)
+    )
+    results = run_backtest(
+        close,
+        bollinger_windows=args.bollinger_windows,
+        donchian_windows=args.donchian_windows,
+        rsi_lower_thresholds=args.rsi_lower_thresholds,
+        rsi_upper_thresholds=args.rsi_upper_thresholds,
+        max_workers=args.max_workers
+    )
+    if len(results) == 0:
+        print('No daily history to backtest.')
+        return
+
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+
+    with pd.option_context(
+            'display.max_rows', None,
+            'display.max_columns', None,
+            'display.width', 120
+            ):
+        print(summarize_backtest(results))
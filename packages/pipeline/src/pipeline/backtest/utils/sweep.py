@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.strategy.init import Strategy
+from pipeline.strategy.utils.signal import Signal, select_signal_codes
+
+
+def _rolling_sums(values: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    # (windows, bars) trailing sums, NaN until a window is complete
+    cumsum = np.concatenate([[0.0], np.cumsum(values)])
+    end = np.arange(1, len(values) + 1)
+    start = end[None, :] - windows[:, None]
+    sums = cumsum[end][None, :] - cumsum[np.clip(start, 0, None)]
+    return np.where(start >= 0, sums, np.nan)
+
+
+def _rolling_extrema(
+        values: np.ndarray,
+        windows: np.ndarray
+        ) -> tuple[np.ndarray, np.ndarray]:
+    max_window = int(windows.max())
+    view = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate([np.full(max_window - 1, np.nan), values]),
+        max_window
+    )[:, ::-1]
+    # Column w - 1 holds the extremum of the trailing w bars
+    maxima = np.fmax.accumulate(view, axis=1)[:, windows - 1].T
+    minima = np.fmin.accumulate(view, axis=1)[:, windows - 1].T
+    complete = np.arange(len(values))[None, :] >= windows[:, None] - 1
+    return (
+        np.where(complete, maxima, np.nan),
+        np.where(complete, minima, np.nan)
+    )
+
+
+def _rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    diff = pd.Series(close).diff()
+    ewm_kwargs = {'alpha': 1 / window, 'min_periods': window, 'adjust': False}
+    emaup = diff.where(diff > 0, 0.0).ewm(**ewm_kwargs).mean().to_numpy()
+    emadn = (-diff.where(diff < 0, 0.0)).ewm(**ewm_kwargs).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(emadn == 0, 100, 100 - 100 / (1 + emaup / emadn))
+
+
+def sweep_bollinger_bands(
+        close: np.ndarray,
+        windows: np.ndarray,
+        window_dev: int = 2
+        ) -> np.ndarray:
+    mean = _rolling_sums(close, windows) / windows[:, None]
+    mean_squares = _rolling_sums(close * close, windows) / windows[:, None]
+    std = np.sqrt(np.clip(mean_squares - mean * mean, 0, None))
+    return select_signal_codes(
+        close < mean - window_dev * std,
+        close > mean + window_dev * std
+    )
+
+
+def sweep_donchian_channel(
+        close: np.ndarray,
+        windows: np.ndarray
+        ) -> np.ndarray:
+    rolling_max, rolling_min = _rolling_extrema(close, windows)
+    return select_signal_codes(close > rolling_max, close < rolling_min)
+
+
+def sweep_rsi(
+        close: np.ndarray,
+        lower_thresholds: np.ndarray,
+        upper_thresholds: np.ndarray
+        ) -> np.ndarray:
+    rsi = _rsi(close)
+    rsi_shifted = np.concatenate([[np.nan], rsi[:-1]])
+    # (lower, upper) grid flattened to one parameter axis, with the same
+    # rule as the live strategy
+    lower = np.repeat(lower_thresholds, len(upper_thresholds))[:, None]
+    upper = np.tile(upper_thresholds, len(lower_thresholds))[:, None]
+    return select_signal_codes(
+        (rsi < lower) & (rsi > rsi_shifted),
+        (rsi > upper) & (rsi < rsi_shifted)
+    )
+
+
+def _positions(signals: np.ndarray) -> np.ndarray:
+    # Long after a Buy, flat after a Sell, otherwise keep the position
+    state = np.where(
+        signals == Signal.BUY.value,
+        1.0,
+        np.where(signals == Signal.SELL.value, 0.0, np.nan)
+    )
+    bars = np.arange(signals.shape[1])
+    last = np.maximum.accumulate(
+        np.where(np.isnan(state), 0, bars[None, :]),
+        axis=1
+    )
+    positions = np.take_along_axis(state, last, axis=1)
+    return np.nan_to_num(positions, nan=0.0)
+
+
+def score_signals(close: np.ndarray, signals: np.ndarray) -> pd.DataFrame:
+    positions = _positions(signals)
+    returns = np.concatenate([[0.0], close[1:] / close[:-1] - 1])
+    # Signals act on the next bar's return
+    held = np.concatenate(
+        [np.zeros((len(positions), 1)), positions[:, :-1]],
+        axis=1
+    )
+    pnl = held * returns[None, :]
+    exposure = held.sum(axis=1)
+    changes = np.diff(positions, axis=1, prepend=0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'pnl': np.prod(1 + pnl, axis=1) - 1,
+            'hit_rate': ((pnl > 0).sum(axis=1) / exposure),
+            'turnover': np.abs(changes).sum(axis=1) / len(close),
+            'trades': (changes > 0).sum(axis=1),
+            'exposure': exposure / len(close),
+        })
+
+
+def run_sweep(
+        stock_code: str,
+        close: np.ndarray,
+        bollinger_windows: list[int],
+        donchian_windows: list[int],
+        rsi_lower_thresholds: list[int],
+        rsi_upper_thresholds: list[int]
+        ) -> pd.DataFrame:
+    bollinger_windows = np.asarray(bollinger_windows)
+    donchian_windows = np.asarray(donchian_windows)
+    lower_thresholds = np.asarray(rsi_lower_thresholds)
+    upper_thresholds = np.asarray(rsi_upper_thresholds)
+
+    results = [
+        score_signals(
+            close,
+            sweep_bollinger_bands(close, bollinger_windows)
+        ).assign(
+            strategy=Strategy.BOLLINGER_BANDS.name,
+            params=[f'window={window}' for window in bollinger_windows]
+        ),
+        score_signals(
+            close,
+            sweep_donchian_channel(close, donchian_windows)
+        ).assign(
+            strategy=Strategy.DONCHIAN_CHANNEL.name,
+            params=[f'window={window}' for window in donchian_windows]
+        ),
+        score_signals(
+            close,
+            sweep_rsi(close, lower_thresholds, upper_thresholds)
+        ).assign(
+            strategy=Strategy.RELATIVE_STRENGTH_INDEX.name,
+            params=[
+                f'lower={lower},upper={upper}'
+                for lower in lower_thresholds
+                for upper in upper_thresholds
+            ]
+        ),
+    ]
+    return pd.concat(results, ignore_index=True).assign(stock_code=stock_code)
@@ -15,6 +15,11 @@ def parse_args():
         dest='dataset_sector',
         default='./data/raw/sectors'
     )
+    init_parser.add_argument(
+        '--dataset-holiday',
+        dest='dataset_holiday',
+        default='./data/raw/holidays'
+    )
     init_parser.add_argument(
         '-D', '--debug',
         action='store_true',
@@ -22,12 +27,154 @@ def parse_args():
     )
 
     daily_parser = command_parser.add_parser('daily')
+    daily_parser.add_argument(
+        '--max-workers',
+        type=int,
+        dest='max_workers',
+        default=4
+    )
+    daily_parser.add_argument(
+        '--rate-limit',
+        type=float,
+        dest='rate_limit',
+        default=2.0,
+        help='Maximum market data requests per second'
+    )
+    daily_parser.add_argument(
+        '--batch-size',
+        type=int,
+        dest='batch_size',
+        default=1,
+        help='Download tickers sharing the same start date in batches'
+    )
+    daily_parser.add_argument(
+        '--strategy-engine',
+        dest='strategy_engine',
+        choices=['incremental', 'batch'],
+        default='incremental'
+    )
+    daily_parser.add_argument(
+        '--columnar',
+        action='store_true',
+        dest='columnar',
+        help='Also write daily bars to the Arrow columnar store'
+    )
+    daily_parser.add_argument(
+        '--resume',
+        action='store_true',
+        dest='resume',
+        help='Only process the stocks and currencies not loaded yet today'
+    )
+    daily_parser.add_argument(
+        '--fill-gaps',
+        action='store_true',
+        dest='fill_gaps',
+        help='Also fetch trading days missing inside the stored history'
+    )
     daily_parser.add_argument(
         '-D', '--debug',
         action='store_true',
         dest='debug'
     )
 
+    backfill_parser = command_parser.add_parser('strategy-backfill')
+    backfill_parser.add_argument(
+        '--from',
+        dest='start_date',
+        required=True,
+        help="First date to evaluate, formatted in 'YYYY-MM-DD'"
+    )
+    backfill_parser.add_argument(
+        '--to',
+        dest='end_date',
+        help="Last date to evaluate, formatted in 'YYYY-MM-DD'"
+    )
+    backfill_parser.add_argument(
+        '--universe',
+        choices=['all', 'watchlist'],
+        default='watchlist'
+    )
+    backfill_parser.add_argument(
+        '--replace',
+        action='store_true',
+        help='Rewrite evaluations that already exist in the date range'
+    )
+    backfill_parser.add_argument(
+        '-D', '--debug',
+        action='store_true',
+        dest='debug'
+    )
+
+    backtest_parser = command_parser.add_parser('backtest')
+    backtest_parser.add_argument(
+        '--universe',
+        choices=['all', 'watchlist'],
+        default='all'
+    )
+    backtest_parser.add_argument(
+        '--from',
+        dest='start_date',
+        help="First date to replay, formatted in 'YYYY-MM-DD'"
+    )
+    backtest_parser.add_argument(
+        '--to',
+        dest='end_date',
+        help="Last date to replay, formatted in 'YYYY-MM-DD'"
+    )
+    backtest_parser.add_argument(
+        '--bollinger-windows',
+        type=int,
+        nargs='+',
+        dest='bollinger_windows',
+        default=[10, 15, 20, 25, 30, 40, 50]
+    )
+    backtest_parser.add_argument(
+        '--donchian-windows',
+        type=int,
+        nargs='+',
+        dest='donchian_windows',
+        default=[10, 20, 30, 55]
+    )
+    backtest_parser.add_argument(
+        '--rsi-lower',
+        type=int,
+        nargs='+',
+        dest='rsi_lower_thresholds',
+        default=[20, 25, 30, 35]
+    )
+    backtest_parser.add_argument(
+        '--rsi-upper',
+        type=int,
+        nargs='+',
+        dest='rsi_upper_thresholds',
+        default=[65, 70, 75, 80]
+    )
+    backtest_parser.add_argument(
+        '--max-workers',
+        type=int,
+        dest='max_workers'
+    )
+    backtest_parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        help='Write the per-stock results to a CSV file'
+    )
+    backtest_parser.add_argument(
+        '-D', '--debug',
+        action='store_true',
+        dest='debug'
+    )
+
+    plans_parser = command_parser.add_parser(
+        'check-plans',
+        help='Fail if a hot query plan scans a table or uses a temp b-tree'
+    )
+    plans_parser.add_argument(
+        '-D', '--debug',
+        action='store_true',
+        dest='debug'
+    )
+
     return parser.parse_args()
 
 
@@ -47,3 +194,18 @@ def main():
 
         run_daily_market_pipeline(args)
         run_daily_strategy_pipeline(args)
+
+    elif args.command == 'strategy-backfill':
+        from .strategy.backfill import run_backfill_strategy_pipeline
+
+        run_backfill_strategy_pipeline(args)
+
+    elif args.command == 'backtest':
+        from .backtest.run import run_backtest_pipeline
+
+        run_backtest_pipeline(args)
+
+    elif args.command == 'check-plans':
+        from .plans import run_check_plans
+
+        run_check_plans(args)
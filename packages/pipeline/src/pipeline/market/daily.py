@@ -1,27 +1,70 @@
+import numpy as np
 import pandas as pd
-import time
 from argparse import Namespace
-from datetime import datetime, timedelta
-from peewee import chunked, Database
+from datetime import date, datetime, timedelta
+from functools import partial
+from itertools import batched, chain
+from peewee import Database
 from tqdm import tqdm
+from typing import Callable, Hashable, Iterable, Iterator
 
 from database import (
     Stock, StockDaily, Currency, CurrencyDaily,
-    User,
-    connect_database, enable_debug
+    User, PipelineCheckpoint,
+    bump_data_version, connect_database, enable_debug
 )
+from database.query import (
+    read_currency_daily,
+    read_stock_dates,
+    read_stock_open_days
+)
+from database.columnar import (
+    ColumnarStore,
+    STOCK_DAILY,
+    STOCK_DAILY_COLUMNS,
+    CURRENCY_DAILY,
+    CURRENCY_DAILY_COLUMNS,
+    currency_pair_key
+)
+
+from pipeline.strategy.incremental import invalidate_indicator_states
+from pipeline.strategy.utils.data import invalidate_stock_daily_data
 
-from .utils.stock import (
-    get_stock_daily_last_date,
-    get_stock_daily
+from .utils.calendar import (
+    EMPTY_SETTLE_DAYS,
+    NO_DATES,
+    get_empty_ranges,
+    load_empty_days,
+    load_holidays,
+    plan_fetch_ranges,
+    record_empty_ranges
 )
-from .utils.currency import (
-    get_currency_daily_last_date,
-    get_currency_daily
+from .utils.checkpoint import (
+    load_done_units,
+    load_failed_units,
+    mark_units_done,
+    mark_units_failed,
+    start_units
+)
+from .utils.stock import get_stock_daily, get_stocks_daily
+from .utils.currency import get_currency_daily, get_currencies_daily
+from .utils.fetch import fetch_streaming
+from .utils.loader import bulk_insert, bulk_load_pragmas
+from .utils.returns import update_returns_daily
+from .utils.sector import update_sector_index_daily
+from .utils.watermark import (
+    load_stock_watermarks,
+    load_currency_watermarks,
+    load_sector_index_watermark,
+    load_returns_watermark
 )
 
 START_DATETIME = datetime(2023, 1, 1)
 
+# Fetched bars are flushed to the loaders once this many rows are buffered,
+# so memory stays flat however large the universe or the backfill is
+FLUSH_ROWS = 50_000
+
 
 def extract_stock_watchlist(username: str) -> list[Stock]:
     user = User.get(User.username == username)
@@ -32,65 +75,402 @@ def extract_stock_watchlist(username: str) -> list[Stock]:
     return stocks
 
 
-def extract_stock_daily(stocks: list[Stock]) -> pd.DataFrame:
-    data = []
-    for stock in tqdm(stocks):
-        last_date = get_stock_daily_last_date(stock.code)
-        if last_date is not None:
-            start_datetime = last_date + timedelta(days=1)
-        else:
-            start_datetime = START_DATETIME
-
-        stock_daily = get_stock_daily(
-            stock.code,
-            start_datetime
-        )
-        stock_daily = (
-            stock_daily
-            .reset_index()
-            .assign(stock_code=stock.code)
-        )
-        data.append(stock_daily)
-        time.sleep(1)
-
-    data = pd.concat(data)
+def _transform_daily(
+        data: pd.DataFrame,
+        start_datetime: date | datetime
+        ) -> pd.DataFrame:
+    data = data.reset_index()
     data.columns = data.columns.str.lower()
     if 'close' not in data.columns \
             and 'adj_close' in data.columns:
-        data['close'] = 'adj_close'
+        data['close'] = data['adj_close']
     return data.loc[
         lambda df: df['date'].ge(start_datetime.strftime('%Y-%m-%d'))
     ]
 
 
+def _fetch_range(
+        fetch: Callable[[date, date], pd.DataFrame],
+        date_range: tuple[date, date]
+        ) -> pd.DataFrame:
+    # Planned ranges are inclusive, while the end of a download is not
+    start, end = date_range
+    return _transform_daily(fetch(start, end + timedelta(days=1)), start)
+
+
+def _fetch_by_range(
+        tasks: dict[Hashable, tuple],
+        fetch: Callable[..., pd.DataFrame],
+        *,
+        on_error: Callable[[Hashable, Exception], None] | None = None,
+        **kwargs
+        ) -> Iterator[tuple[Hashable, pd.DataFrame]]:
+    '''Fetch every planned range of a task as its own request, so each
+    range takes its own rate limit token and is retried alone.
+
+    The last argument of a task is its ranges. A task is yielded once all
+    its ranges are fetched, and dropped as soon as one of them fails, so a
+    failed unit never loads part of its bars.
+    '''
+    range_tasks = {
+        (key, i): (*args[:-1], date_range)
+        for key, args in tasks.items()
+        for i, date_range in enumerate(args[-1])
+    }
+    n_left = {key: len(args[-1]) for key, args in tasks.items()}
+    frames = {key: [] for key in tasks}
+
+    def on_range_error(range_key: tuple[Hashable, int], error: Exception):
+        key, _ = range_key
+        if frames.pop(key, None) is not None and on_error is not None:
+            on_error(key, error)
+
+    for (key, _), data in fetch_streaming(
+            range_tasks,
+            fetch,
+            on_error=on_range_error,
+            **kwargs
+            ):
+        if key not in frames:
+            continue
+
+        frames[key].append(data)
+        n_left[key] -= 1
+        if n_left[key] == 0:
+            yield key, pd.concat(frames.pop(key), ignore_index=True)
+
+
+def _fetch_stock_daily(
+        stock_code: str,
+        date_range: tuple[date, date]
+        ) -> pd.DataFrame:
+    return (
+        _fetch_range(partial(get_stock_daily, stock_code), date_range)
+        .assign(stock_code=stock_code)
+    )
+
+
+def _fetch_stocks_daily(
+        stock_codes: tuple[str, ...],
+        date_range: tuple[date, date]
+        ) -> pd.DataFrame:
+    return _fetch_range(
+        partial(get_stocks_daily, list(stock_codes)),
+        date_range
+    )
+
+
+def _batch_frames(
+        frames: Iterable[tuple[list[str], pd.DataFrame]],
+        flush_rows: int = FLUSH_ROWS
+        ) -> Iterator[tuple[list[str], pd.DataFrame]]:
+    # Units travel with their bars, so a flushed batch can be checkpointed
+    # even for units that had no new bars
+    units = []
+    batch = []
+    n_rows = 0
+    for data_units, data in frames:
+        units.extend(data_units)
+        if len(data) > 0:
+            batch.append(data)
+            n_rows += len(data)
+        if n_rows >= flush_rows:
+            yield units, pd.concat(batch, ignore_index=True)
+            units = []
+            batch = []
+            n_rows = 0
+
+    if len(units) > 0:
+        data = pd.concat(batch, ignore_index=True) \
+            if len(batch) > 0 else pd.DataFrame()
+        yield units, data
+
+
+def _first_date(first_date: date | None, data: pd.DataFrame) -> date | None:
+    if len(data) == 0:
+        return first_date
+
+    data_first_date = data['date'].min().date()
+    if first_date is None:
+        return data_first_date
+    return min(first_date, data_first_date)
+
+
+def _group_by_ranges(
+        ranges: dict[str, tuple[tuple[date, date], ...]],
+        batch_size: int
+        ) -> dict[tuple[tuple, int], tuple]:
+    groups = {}
+    for code, code_ranges in ranges.items():
+        groups.setdefault(code_ranges, []).append(code)
+
+    return {
+        (code_ranges, i): (codes, code_ranges)
+        for code_ranges, group in groups.items()
+        for i, codes in enumerate(batched(group, batch_size))
+    }
+
+
+def _record_empty_ranges(
+        results: Iterable[tuple[Hashable, pd.DataFrame]],
+        units: dict[Hashable, list[str]],
+        ranges: dict[str, tuple[tuple[date, date], ...]],
+        get_units: Callable[[pd.DataFrame], pd.Series],
+        *,
+        unit_type: str,
+        holidays: np.ndarray = NO_DATES
+        ) -> Iterator[tuple[Hashable, pd.DataFrame]]:
+    # Recent days only settle later, their bars may not be published yet
+    end_date = date.today() - timedelta(days=EMPTY_SETTLE_DAYS)
+    for key, data in results:
+        bar_days = {}
+        if len(data) > 0:
+            bars = data.loc[data['close'].notna()]
+            bar_days = {
+                unit: days.to_numpy().astype('datetime64[D]')
+                for unit, days in bars['date'].groupby(get_units(bars))
+            }
+
+        record_empty_ranges(unit_type, {
+            unit: get_empty_ranges(
+                ranges[unit],
+                bar_days.get(unit, NO_DATES),
+                end_date,
+                holidays
+            )
+            for unit in units[key]
+        })
+        yield key, data
+
+
+def _plan_stock_ranges(
+        stock_codes: list[str],
+        fill_gaps: bool,
+        holidays: np.ndarray
+        ) -> dict[str, tuple[tuple[date, date], ...]]:
+    end_date = date.today()
+    open_days = None
+    if fill_gaps:
+        present_days = read_stock_dates(stock_codes, START_DATETIME, end_date)
+        # Closures are read from every stock, not only the ones planned,
+        # as a single stock's gap would otherwise look like a closure
+        open_days = read_stock_open_days(START_DATETIME, end_date)
+    else:
+        present_days = {
+            code: np.array([last_date], dtype='datetime64[D]')
+            for code, last_date in load_stock_watermarks(stock_codes).items()
+        }
+
+    ranges = plan_fetch_ranges(
+        stock_codes,
+        present_days,
+        START_DATETIME.date(),
+        end_date,
+        holidays=holidays,
+        open_days=open_days,
+        empty_days=load_empty_days(PipelineCheckpoint.STOCK),
+        fill_gaps=fill_gaps
+    )
+    return {code: tuple(code_ranges) for code, code_ranges in ranges.items()}
+
+
+def extract_stock_daily(
+        stocks: list[Stock],
+        *,
+        max_workers: int = 4,
+        rate_limit: float = 2.0,
+        batch_size: int = 1,
+        flush_rows: int = FLUSH_ROWS,
+        on_error: Callable[[list[str], Exception], None] | None = None,
+        fill_gaps: bool = False
+        ) -> Iterator[tuple[list[str], pd.DataFrame]]:
+    '''Stream the new bars of `stocks` in batches of about `flush_rows`,
+    each with the stock codes it completes.
+
+    Only IDX trading days missing from the database are fetched, and
+    stocks with nothing to fetch complete without a request.
+    '''
+    stock_codes = [stock.code for stock in stocks]
+    holidays = load_holidays()
+    ranges = _plan_stock_ranges(stock_codes, fill_gaps, holidays)
+    up_to_date = [code for code in stock_codes if code not in ranges]
+
+    if batch_size > 1:
+        fetch = _fetch_stocks_daily
+        tasks = _group_by_ranges(ranges, batch_size)
+        units = {key: list(codes) for key, (codes, _) in tasks.items()}
+    else:
+        fetch = _fetch_stock_daily
+        tasks = {
+            code: (code, code_ranges)
+            for code, code_ranges in ranges.items()
+        }
+        units = {code: [code] for code in tasks}
+
+    results = _fetch_by_range(
+        tasks,
+        fetch,
+        max_workers=max_workers,
+        rate_limit=rate_limit,
+        on_error=None if on_error is None
+            else lambda key, error: on_error(units[key], error)
+    )
+    results = _record_empty_ranges(
+        results,
+        units,
+        ranges,
+        lambda data: data['stock_code'],
+        unit_type=PipelineCheckpoint.STOCK,
+        holidays=holidays
+    )
+    return _batch_frames(
+        chain(
+            [(up_to_date, pd.DataFrame())],
+            ((units[key], data) for key, data in results)
+        ),
+        flush_rows
+    )
+
+
 def load_stock_daily_to_db(
         data: pd.DataFrame,
         *,
         database: Database,
-        chunk_size: int = 64,
+        chunk_size: int | None = None,
         ):
     if len(data) == 0:
         return
 
-    data = (
-        data[[
-            'stock_code',
-            'date',
-            'open',
-            'high',
-            'low',
-            'close',
-            'volume'
-        ]]
-        .to_dict('records')
-    )
-    with database.atomic():
-        for batch in chunked(data, chunk_size):
-            (
+    data = data.dropna(subset=['close', 'volume'])
+    with bulk_load_pragmas(database):
+        bulk_insert(
+            StockDaily,
+            data.astype({'volume': 'int64'}),
+            [
+                'stock_code',
+                'date',
+                'open',
+                'high',
+                'low',
+                'close',
+                'volume'
+            ],
+            database=database,
+            chunk_size=chunk_size
+        )
+    invalidate_stock_daily_data(data['stock_code'].unique())
+    invalidate_indicator_states(data)
+    bump_data_version()
+
+
+def _load_batches(
+        batches: Iterable[tuple[list[str], pd.DataFrame]],
+        load: Callable[[pd.DataFrame], dict[str, int]],
+        *,
+        run_date: date,
+        unit_type: str
+        ) -> date | None:
+    # A batch failing to load only fails its own units, the rest go on
+    first_date = None
+    for units, data in batches:
+        try:
+            rows_loaded = load(data)
+        except Exception as error:
+            tqdm.write(f'Failed to load {len(units)} {unit_type}: {error!r}')
+            mark_units_failed(run_date, unit_type, units, error)
+            continue
+
+        mark_units_done(
+            run_date,
+            unit_type,
+            {unit: rows_loaded.get(unit, 0) for unit in units}
+        )
+        first_date = _first_date(first_date, data)
+    return first_date
+
+
+def load_stock_daily(
+        batches: Iterable[tuple[list[str], pd.DataFrame]],
+        stock_codes: list[str],
+        *,
+        database: Database,
+        run_date: date,
+        store: ColumnarStore | None = None
+        ) -> date | None:
+    '''Load streamed batches as they arrive, checkpointing their stocks,
+    and return the first new date.'''
+    def load(data: pd.DataFrame) -> dict[str, int]:
+        if len(data) == 0:
+            return {}
+
+        load_stock_daily_to_db(data, database=database)
+        if store is not None:
+            load_stock_daily_to_columnar(
+                data,
+                data['stock_code'].unique().tolist(),
+                store=store
+            )
+        return data['stock_code'].value_counts().to_dict()
+
+    first_date = _load_batches(
+        batches,
+        load,
+        run_date=run_date,
+        unit_type=PipelineCheckpoint.STOCK
+    )
+
+    # Tickers without new bars still get their history exported once
+    if store is not None:
+        load_stock_daily_to_columnar(
+            pd.DataFrame(),
+            stock_codes,
+            store=store
+        )
+    return first_date
+
+
+def load_sector_index_daily(
+        first_date: date | None,
+        *,
+        database: Database
+        ):
+    # Only dates from the earliest new bar on are recomputed, as a late
+    # bar changes the average of a date that was already materialized
+    start_date = load_sector_index_watermark()
+    if start_date is not None:
+        start_date += timedelta(days=1)
+    if start_date is not None and first_date is not None:
+        start_date = min(start_date, first_date)
+
+    update_sector_index_daily(start_date, database=database)
+
+
+def load_stock_daily_to_columnar(
+        data: pd.DataFrame,
+        stock_codes: list[str],
+        *,
+        store: ColumnarStore
+        ):
+    for stock_code in stock_codes:
+        if not store.has(STOCK_DAILY, stock_code):
+            # First write of a ticker exports its whole SQLite history
+            stock_daily = pd.DataFrame(
                 StockDaily
-                .insert_many(batch)
-                .on_conflict_ignore()
-                .execute()
+                .select()
+                .where(StockDaily.stock_code == stock_code)
+                .dicts()
+            )
+        elif len(data) > 0:
+            stock_daily = data.loc[data['stock_code'].eq(stock_code)]
+        else:
+            continue
+
+        if len(stock_daily) > 0:
+            store.write(
+                STOCK_DAILY,
+                stock_code,
+                stock_daily,
+                STOCK_DAILY_COLUMNS
             )
 
 
@@ -101,75 +481,267 @@ def extract_currencies() -> list[Currency]:
     )
 
 
-def extract_currency_daily(currencies: list[Currency]) -> pd.DataFrame:
-    data = []
-    for currency in tqdm(currencies):
-        last_date = get_currency_daily_last_date(
-            'USD',
-            currency.code
+def _fetch_currency_daily(
+        from_code: str,
+        to_code: str,
+        date_range: tuple[date, date]
+        ) -> pd.DataFrame:
+    return (
+        _fetch_range(
+            partial(get_currency_daily, from_code, to_code),
+            date_range
         )
-        if last_date is not None:
-            start_datetime = last_date + timedelta(days=1)
-        else:
-            start_datetime = START_DATETIME
-
-        currency_daily = get_currency_daily(
-            'USD',
-            currency.code,
-            start_datetime
+        .assign(
+            from_currency_code=from_code,
+            to_currency_code=to_code
         )
-        currency_daily = (
-            currency_daily
-            .reset_index()
-            .assign(
-                from_currency_code='USD',
-                to_currency_code=currency.code
+    )
+
+
+def _fetch_currencies_daily(
+        to_codes: tuple[str, ...],
+        date_range: tuple[date, date]
+        ) -> pd.DataFrame:
+    return _fetch_range(
+        partial(
+            get_currencies_daily,
+            [('USD', to_code) for to_code in to_codes]
+        ),
+        date_range
+    )
+
+
+def _plan_currency_ranges(
+        to_codes: list[str],
+        fill_gaps: bool
+        ) -> dict[str, tuple[tuple[date, date], ...]]:
+    end_date = date.today()
+    if fill_gaps:
+        present_days = {
+            to_code: read_currency_daily(
+                'USD',
+                to_code,
+                START_DATETIME,
+                end_date
+            )['date'].to_numpy().astype('datetime64[D]')
+            for to_code in to_codes
+        }
+    else:
+        present_days = {
+            to_code: np.array([last_date], dtype='datetime64[D]')
+            for (_, to_code), last_date in load_currency_watermarks(
+                [('USD', to_code) for to_code in to_codes]
+            ).items()
+        }
+
+    empty_days = load_empty_days(PipelineCheckpoint.CURRENCY)
+
+    # Currencies trade on every weekday, exchange holidays do not apply and
+    # every weekday is expected, days without a quote are recorded empty
+    ranges = plan_fetch_ranges(
+        to_codes,
+        present_days,
+        START_DATETIME.date(),
+        end_date,
+        empty_days={
+            to_code: empty_days.get(
+                currency_pair_key('USD', to_code),
+                NO_DATES
             )
-        )
-        data.append(currency_daily)
-        time.sleep(1)
+            for to_code in to_codes
+        },
+        fill_gaps=fill_gaps
+    )
+    return {code: tuple(code_ranges) for code, code_ranges in ranges.items()}
 
-    data = pd.concat(data)
-    data.columns = data.columns.str.lower()
-    if 'close' not in data.columns \
-            and 'adj_close' in data.columns:
-        data['close'] = 'adj_close'
-    return data.loc[
-        lambda df: df['date'].ge(start_datetime.strftime('%Y-%m-%d'))
+
+def extract_currency_daily(
+        currencies: list[Currency],
+        *,
+        max_workers: int = 4,
+        rate_limit: float = 2.0,
+        batch_size: int = 1,
+        flush_rows: int = FLUSH_ROWS,
+        on_error: Callable[[list[str], Exception], None] | None = None,
+        fill_gaps: bool = False
+        ) -> Iterator[tuple[list[str], pd.DataFrame]]:
+    '''Stream the new bars of USD pairs in batches of about `flush_rows`,
+    each with the currency pair keys it completes.'''
+    to_codes = [currency.code for currency in currencies]
+    ranges = _plan_currency_ranges(to_codes, fill_gaps)
+    up_to_date = [
+        currency_pair_key('USD', code)
+        for code in to_codes
+        if code not in ranges
     ]
 
+    if batch_size > 1:
+        fetch = _fetch_currencies_daily
+        tasks = _group_by_ranges(ranges, batch_size)
+        units = {
+            key: [currency_pair_key('USD', code) for code in codes]
+            for key, (codes, _) in tasks.items()
+        }
+    else:
+        fetch = _fetch_currency_daily
+        tasks = {
+            code: ('USD', code, code_ranges)
+            for code, code_ranges in ranges.items()
+        }
+        units = {code: [currency_pair_key('USD', code)] for code in tasks}
+
+    results = _fetch_by_range(
+        tasks,
+        fetch,
+        max_workers=max_workers,
+        rate_limit=rate_limit,
+        on_error=None if on_error is None
+            else lambda key, error: on_error(units[key], error)
+    )
+    results = _record_empty_ranges(
+        results,
+        units,
+        {
+            currency_pair_key('USD', code): code_ranges
+            for code, code_ranges in ranges.items()
+        },
+        lambda data: data['from_currency_code'] + '-'
+            + data['to_currency_code'],
+        unit_type=PipelineCheckpoint.CURRENCY
+    )
+    return _batch_frames(
+        chain(
+            [(up_to_date, pd.DataFrame())],
+            ((units[key], data) for key, data in results)
+        ),
+        flush_rows
+    )
+
 
 def load_currency_daily_to_db(
         data: pd.DataFrame,
         *,
         database: Database,
-        chunk_size: int = 64,
+        chunk_size: int | None = None,
         ):
     if len(data) == 0:
         return
 
-    data = (
-        data[[
-            'from_currency_code',
-            'to_currency_code',
-            'date',
-            'open',
-            'high',
-            'low',
-            'close'
-        ]]
-        .to_dict('records')
-    )
-    with database.atomic():
-        for batch in chunked(data, chunk_size):
-            (
+    with bulk_load_pragmas(database):
+        bulk_insert(
+            CurrencyDaily,
+            data,
+            [
+                'from_currency_code',
+                'to_currency_code',
+                'date',
+                'open',
+                'high',
+                'low',
+                'close'
+            ],
+            database=database,
+            chunk_size=chunk_size
+        )
+    bump_data_version()
+
+
+def load_currency_daily_to_columnar(
+        data: pd.DataFrame,
+        currency_pairs: list[tuple[str, str]],
+        *,
+        store: ColumnarStore
+        ):
+    for from_code, to_code in currency_pairs:
+        key = currency_pair_key(from_code, to_code)
+        if not store.has(CURRENCY_DAILY, key):
+            currency_daily = pd.DataFrame(
                 CurrencyDaily
-                .insert_many(batch)
-                .on_conflict_ignore()
-                .execute()
+                .select()
+                .where(
+                    (CurrencyDaily.from_currency_code == from_code)
+                    & (CurrencyDaily.to_currency_code == to_code)
+                )
+                .dicts()
+            )
+        elif len(data) > 0:
+            currency_daily = data.loc[
+                data['from_currency_code'].eq(from_code)
+                & data['to_currency_code'].eq(to_code)
+            ]
+        else:
+            continue
+
+        if len(currency_daily) > 0:
+            store.write(
+                CURRENCY_DAILY,
+                key,
+                currency_daily,
+                CURRENCY_DAILY_COLUMNS
             )
 
 
+def load_currency_daily(
+        batches: Iterable[tuple[list[str], pd.DataFrame]],
+        currency_pairs: list[tuple[str, str]],
+        *,
+        database: Database,
+        run_date: date,
+        store: ColumnarStore | None = None
+        ) -> date | None:
+    '''Load streamed batches as they arrive, checkpointing their currency
+    pairs, and return the first new date.'''
+    def load(data: pd.DataFrame) -> dict[str, int]:
+        if len(data) == 0:
+            return {}
+
+        load_currency_daily_to_db(data, database=database)
+        pairs = data.groupby(
+            ['from_currency_code', 'to_currency_code']
+        ).size()
+        if store is not None:
+            load_currency_daily_to_columnar(
+                data,
+                pairs.index.tolist(),
+                store=store
+            )
+        return {
+            currency_pair_key(from_code, to_code): n_rows
+            for (from_code, to_code), n_rows in pairs.items()
+        }
+
+    first_date = _load_batches(
+        batches,
+        load,
+        run_date=run_date,
+        unit_type=PipelineCheckpoint.CURRENCY
+    )
+
+    if store is not None:
+        load_currency_daily_to_columnar(
+            pd.DataFrame(),
+            currency_pairs,
+            store=store
+        )
+    return first_date
+
+
+def load_returns_daily(
+        first_dates: list[date | None],
+        *,
+        database: Database
+        ):
+    start_date = load_returns_watermark()
+    if start_date is not None:
+        start_date += timedelta(days=1)
+        for first_date in first_dates:
+            if first_date is not None:
+                start_date = min(start_date, first_date)
+
+    update_returns_daily(start_date, database=database)
+    bump_data_version()
+
+
 def run_daily_market_pipeline(args: Namespace):
     if args.debug:
         enable_debug()
@@ -177,11 +749,86 @@ def run_daily_market_pipeline(args: Namespace):
     db = connect_database()
 
     username = 'default'
+    run_date = date.today()
+
+    # Once created, the columnar store is kept in sync on every run
+    store = ColumnarStore()
+    if not (args.columnar or store.exists()):
+        store = None
 
+    # A resumed run skips the units already loaded by today's runs
     stocks = extract_stock_watchlist(username)
-    stock_daily = extract_stock_daily(stocks)
-    load_stock_daily_to_db(stock_daily, database=db)
+    stock_codes = [stock.code for stock in stocks]
+    if args.resume:
+        done_units = load_done_units(run_date, PipelineCheckpoint.STOCK)
+        stocks = [stock for stock in stocks if stock.code not in done_units]
+    start_units(
+        run_date,
+        PipelineCheckpoint.STOCK,
+        [stock.code for stock in stocks]
+    )
+    stock_first_date = load_stock_daily(
+        extract_stock_daily(
+            stocks,
+            max_workers=args.max_workers,
+            rate_limit=args.rate_limit,
+            batch_size=args.batch_size,
+            on_error=partial(
+                mark_units_failed,
+                run_date,
+                PipelineCheckpoint.STOCK
+            ),
+            fill_gaps=args.fill_gaps
+        ),
+        stock_codes,
+        database=db,
+        run_date=run_date,
+        store=store
+    )
+    load_sector_index_daily(stock_first_date, database=db)
 
     currencies = extract_currencies()
-    currency_daily = extract_currency_daily(currencies)
-    load_currency_daily_to_db(currency_daily, database=db)
+    currency_pairs = [('USD', currency.code) for currency in currencies]
+    if args.resume:
+        done_units = load_done_units(run_date, PipelineCheckpoint.CURRENCY)
+        currencies = [
+            currency
+            for currency in currencies
+            if currency_pair_key('USD', currency.code) not in done_units
+        ]
+    start_units(
+        run_date,
+        PipelineCheckpoint.CURRENCY,
+        [currency_pair_key('USD', currency.code) for currency in currencies]
+    )
+    currency_first_date = load_currency_daily(
+        extract_currency_daily(
+            currencies,
+            max_workers=args.max_workers,
+            rate_limit=args.rate_limit,
+            batch_size=args.batch_size,
+            on_error=partial(
+                mark_units_failed,
+                run_date,
+                PipelineCheckpoint.CURRENCY
+            ),
+            fill_gaps=args.fill_gaps
+        ),
+        currency_pairs,
+        database=db,
+        run_date=run_date,
+        store=store
+    )
+
+    load_returns_daily(
+        [stock_first_date, currency_first_date],
+        database=db
+    )
+
+    failed_units = load_failed_units(run_date)
+    if len(failed_units) > 0:
+        print(
+            f'{len(failed_units)} units failed: '
+            + ', '.join(code for _, code in failed_units)
+            + '. Run `pipeline daily --resume` to retry them.'
+        )
@@ -7,7 +7,7 @@ from peewee import Database, chunked, fn
 
 from database import (
     Sector, Stock, User, UserStockWatchlist,
-    Currency, CurrencyDaily,
+    Currency, CurrencyDaily, TradingHoliday,
     connect_database, enable_debug
 )
 
@@ -124,6 +124,37 @@ def create_default_currencies(
         )
 
 
+def extract_holidays(dataset_dir: Path) -> pd.DataFrame:
+    # One CSV of `date,name` rows per exchange, e.g. IDX.csv
+    data = []
+    for dataset_path in dataset_dir.glob('*.csv'):
+        holidays = pd.read_csv(dataset_path)
+        holidays['exchange'] = dataset_path.stem.upper()
+        data.append(holidays)
+
+    if len(data) == 0:
+        return pd.DataFrame()
+    return pd.concat(data)
+
+
+def load_holidays_to_db(
+        data: pd.DataFrame,
+        *,
+        database: Database
+        ):
+    if len(data) == 0:
+        return
+
+    data = data[['exchange', 'date', 'name']].to_dict('records')
+    with database.atomic():
+        (
+            TradingHoliday
+            .insert_many(data)
+            .on_conflict_ignore()
+            .execute()
+        )
+
+
 def create_pipeline_user(
         username: str,
         *,
@@ -195,3 +226,6 @@ def run_init_market_pipeline(args: Namespace):
 
     create_default_currencies(database=db)
 
+    holidays = extract_holidays(Path(args.dataset_holiday))
+    load_holidays_to_db(holidays, database=db)
+
@@ -0,0 +1,188 @@
+import numpy as np
+from datetime import date, datetime
+from peewee import fn
+from typing import Hashable
+
+from database import EmptyFetchRange, TradingHoliday
+
+NO_DATES = np.empty(0, dtype='datetime64[D]')
+
+# Days are only recorded empty once Yahoo had this long to publish their
+# bars, and are fetched again once the record is this old, so an empty
+# answer that was transient is not trusted for good
+EMPTY_SETTLE_DAYS = 7
+EMPTY_TTL_DAYS = 30
+
+
+def load_holidays(exchange: str = TradingHoliday.IDX) -> np.ndarray:
+    return np.array(
+        [
+            holiday_date
+            for holiday_date, in (
+                TradingHoliday
+                .select(TradingHoliday.date)
+                .where(TradingHoliday.exchange == exchange)
+                .tuples()
+            )
+        ],
+        dtype='datetime64[D]'
+    )
+
+
+def load_empty_days(
+        unit_type: str,
+        ttl_days: int = EMPTY_TTL_DAYS
+        ) -> dict[str, np.ndarray]:
+    ranges = {}
+    for unit_code, start_date, end_date in (
+            EmptyFetchRange
+            .select(
+                EmptyFetchRange.unit_code,
+                EmptyFetchRange.start_date,
+                EmptyFetchRange.end_date
+            )
+            .where(
+                (EmptyFetchRange.unit_type == unit_type)
+                & (
+                    EmptyFetchRange.created_datetime
+                    >= fn.datetime('now', f'-{ttl_days} days')
+                )
+            )
+            .tuples()
+            ):
+        ranges.setdefault(unit_code, []).append(
+            np.arange(
+                np.datetime64(start_date, 'D'),
+                np.datetime64(end_date, 'D') + 1
+            )
+        )
+    return {
+        unit_code: np.unique(np.concatenate(days))
+        for unit_code, days in ranges.items()
+    }
+
+
+def record_empty_ranges(
+        unit_type: str,
+        ranges: dict[str, list[tuple[date, date]]]
+        ):
+    rows = [
+        {
+            'unit_type': unit_type,
+            'unit_code': unit_code,
+            'start_date': start_date,
+            'end_date': end_date,
+        }
+        for unit_code, unit_ranges in ranges.items()
+        for start_date, end_date in unit_ranges
+    ]
+    if len(rows) == 0:
+        return
+
+    # An expired range found empty again is recorded anew
+    EmptyFetchRange.insert_many(rows).on_conflict_replace().execute()
+
+
+def get_trading_days(
+        start_date: date | datetime,
+        end_date: date | datetime,
+        holidays: np.ndarray = NO_DATES
+        ) -> np.ndarray:
+    '''Weekdays from `start_date` to `end_date` that are not `holidays`.'''
+    days = np.arange(
+        np.datetime64(start_date, 'D'),
+        np.datetime64(end_date, 'D') + 1
+    )
+    return days[np.is_busday(days, holidays=holidays)]
+
+
+def get_missing_ranges(
+        expected_days: np.ndarray,
+        present_days: np.ndarray
+        ) -> list[tuple[date, date]]:
+    '''Missing `expected_days` as inclusive ranges, merging days that are
+    adjacent in `expected_days` so non-trading days never split a range.'''
+    missing = np.flatnonzero(~np.isin(expected_days, present_days))
+    if len(missing) == 0:
+        return []
+
+    breaks = np.flatnonzero(np.diff(missing) > 1) + 1
+    starts = missing[np.r_[0, breaks]]
+    ends = missing[np.r_[breaks - 1, len(missing) - 1]]
+    return [
+        (expected_days[start].item(), expected_days[end].item())
+        for start, end in zip(starts, ends)
+    ]
+
+
+def get_empty_ranges(
+        ranges: list[tuple[date, date]],
+        bar_days: np.ndarray,
+        end_date: date,
+        holidays: np.ndarray = NO_DATES
+        ) -> list[tuple[date, date]]:
+    '''Trading days of fetched `ranges` up to `end_date` that came back
+    without a bar, as inclusive ranges.'''
+    return [
+        empty_range
+        for start_date, range_end_date in ranges
+        for empty_range in get_missing_ranges(
+            get_trading_days(
+                start_date,
+                min(range_end_date, end_date),
+                holidays
+            ),
+            bar_days
+        )
+    ]
+
+
+def plan_fetch_ranges(
+        keys: list[Hashable],
+        present_days: dict[Hashable, np.ndarray],
+        start_date: date,
+        end_date: date,
+        *,
+        holidays: np.ndarray = NO_DATES,
+        open_days: np.ndarray | None = None,
+        empty_days: dict[Hashable, np.ndarray] | None = None,
+        fill_gaps: bool = False
+        ) -> dict[Hashable, list[tuple[date, date]]]:
+    '''Smallest set of date ranges to fetch per key, keys that are up to
+    date are left out.
+
+    Only trading days after the last present day are planned, unless
+    `fill_gaps`, then missing days inside the history are planned too.
+    Given `open_days`, the days any bar of the whole table exists on, a
+    day outside them is taken as a closure the holidays do not list, so
+    it is never planned as a gap. The `empty_days` of a key were fetched
+    before without a bar, and are planned as if present.
+    '''
+    if empty_days is None:
+        empty_days = {}
+
+    trading_days = get_trading_days(start_date, end_date, holidays)
+    if fill_gaps and open_days is not None and len(open_days) > 0:
+        # Days outside the table's history are not known closures
+        trading_days = trading_days[
+            np.isin(trading_days, open_days)
+            | (trading_days < open_days.min())
+            | (trading_days > open_days.max())
+        ]
+
+    ranges = {}
+    for key in keys:
+        days = present_days.get(key, NO_DATES)
+        if key in empty_days:
+            days = np.union1d(days, empty_days[key])
+        if len(days) == 0:
+            expected_days = trading_days
+        elif fill_gaps:
+            expected_days = trading_days[trading_days >= days[0]]
+        else:
+            expected_days = trading_days[trading_days > days[-1]]
+
+        key_ranges = get_missing_ranges(expected_days, days)
+        if len(key_ranges) > 0:
+            ranges[key] = key_ranges
+    return ranges
@@ -0,0 +1,128 @@
+from datetime import date
+from peewee import SQL
+
+from database import PipelineCheckpoint
+
+
+def load_done_units(run_date: date, unit_type: str) -> set[str]:
+    return {
+        checkpoint.unit_code
+        for checkpoint in (
+            PipelineCheckpoint
+            .select(PipelineCheckpoint.unit_code)
+            .where(
+                (PipelineCheckpoint.run_date == run_date)
+                & (PipelineCheckpoint.unit_type == unit_type)
+                & (PipelineCheckpoint.status == PipelineCheckpoint.DONE)
+            )
+        )
+    }
+
+
+def load_failed_units(run_date: date) -> list[tuple[str, str]]:
+    return list(
+        PipelineCheckpoint
+        .select(PipelineCheckpoint.unit_type, PipelineCheckpoint.unit_code)
+        .where(
+            (PipelineCheckpoint.run_date == run_date)
+            & (PipelineCheckpoint.status == PipelineCheckpoint.FAILED)
+        )
+        .order_by(PipelineCheckpoint.unit_type, PipelineCheckpoint.unit_code)
+        .tuples()
+    )
+
+
+def start_units(run_date: date, unit_type: str, unit_codes: list[str]):
+    # Every start of a unit counts as an attempt, even if it never finishes
+    if len(unit_codes) == 0:
+        return
+
+    (
+        PipelineCheckpoint
+        .insert_many(
+            [
+                {
+                    'run_date': run_date,
+                    'unit_type': unit_type,
+                    'unit_code': unit_code,
+                    'status': PipelineCheckpoint.PENDING,
+                    'attempt_count': 1,
+                }
+                for unit_code in unit_codes
+            ]
+        )
+        .on_conflict(
+            conflict_target=[
+                PipelineCheckpoint.run_date,
+                PipelineCheckpoint.unit_type,
+                PipelineCheckpoint.unit_code
+            ],
+            update={
+                PipelineCheckpoint.status: PipelineCheckpoint.PENDING,
+                PipelineCheckpoint.attempt_count:
+                    PipelineCheckpoint.attempt_count + 1,
+                PipelineCheckpoint.modified_datetime:
+                    SQL('CURRENT_TIMESTAMP'),
+            }
+        )
+        .execute()
+    )
+
+
+def _update_units(
+        run_date: date,
+        unit_type: str,
+        unit_codes: list[str],
+        **values
+        ):
+    (
+        PipelineCheckpoint
+        .update(modified_datetime=SQL('CURRENT_TIMESTAMP'), **values)
+        .where(
+            (PipelineCheckpoint.run_date == run_date)
+            & (PipelineCheckpoint.unit_type == unit_type)
+            & PipelineCheckpoint.unit_code.in_(unit_codes)
+        )
+        .execute()
+    )
+
+
+def mark_units_done(
+        run_date: date,
+        unit_type: str,
+        rows_loaded: dict[str, int]
+        ):
+    # One update per distinct row count, all committed together, so a
+    # flushed batch costs one commit rather than one per unit
+    units_by_rows = {}
+    for unit_code, n_rows in rows_loaded.items():
+        units_by_rows.setdefault(n_rows, []).append(unit_code)
+
+    with PipelineCheckpoint._meta.database.atomic():
+        for n_rows, unit_codes in units_by_rows.items():
+            _update_units(
+                run_date,
+                unit_type,
+                unit_codes,
+                status=PipelineCheckpoint.DONE,
+                rows_loaded=n_rows,
+                last_error=None
+            )
+
+
+def mark_units_failed(
+        run_date: date,
+        unit_type: str,
+        unit_codes: list[str],
+        error: Exception
+        ):
+    if len(unit_codes) == 0:
+        return
+
+    _update_units(
+        run_date,
+        unit_type,
+        unit_codes,
+        status=PipelineCheckpoint.FAILED,
+        last_error=repr(error)
+    )
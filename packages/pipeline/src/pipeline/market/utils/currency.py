@@ -1,38 +1,38 @@
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
-from peewee import fn
 
-from database import CurrencyDaily
+from .yahoo import download_daily, history_daily
 
 
-def get_currency_daily_last_date(
+def get_currency_daily(
         from_code: str,
-        to_code: str = 'USD'
-        ) -> datetime | None:
-    return (
-        CurrencyDaily
-        .select(fn.MAX(CurrencyDaily.date).alias('date'))
-        .where(
-            (CurrencyDaily.from_currency_code == from_code)
-            & (CurrencyDaily.to_currency_code == to_code)
-        )
-        .scalar()
+        to_code: str,
+        start_datetime: datetime | None = None,
+        end_datetime: datetime | None = None
+        ) -> pd.DataFrame:
+    return history_daily(
+        f'{from_code}{to_code}=X',
+        start_datetime,
+        end_datetime
     )
 
 
-def get_currency_daily(
-        from_code: str,
-        to_code: str,
+def get_currencies_daily(
+        currency_pairs: list[tuple[str, str]],
         start_datetime: datetime | None = None,
         end_datetime: datetime | None = None
         ) -> pd.DataFrame:
-    ticker = f'{from_code}{to_code}=X'
-    currency_data = yf.download(
-        ticker,
-        start=start_datetime,
-        end=end_datetime,
-        group_by='ticker',
-        progress=False
+    tickers = {
+        f'{from_code}{to_code}=X': (from_code, to_code)
+        for from_code, to_code in currency_pairs
+    }
+    currency_data = download_daily(
+        list(tickers),
+        start_datetime,
+        end_datetime
+    )
+    pairs = currency_data.pop('Ticker').map(tickers)
+    return currency_data.assign(
+        from_currency_code=pairs.str[0],
+        to_currency_code=pairs.str[1]
     )
-    return currency_data.droplevel(0, axis=1)
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Hashable, Iterator, TypeVar
+
+from tqdm import tqdm
+
+T = TypeVar('T')
+
+
+class RateLimiter:
+    '''Token bucket shared by every fetch worker.'''
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError('Rate limit must be greater than 0.')
+
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_with_retry(
+        fetch: Callable[..., T],
+        *args: Any,
+        limiter: RateLimiter | None = None,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        ) -> T:
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+
+        try:
+            return fetch(*args)
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_streaming(
+        tasks: dict[Hashable, tuple],
+        fetch: Callable[..., T],
+        *,
+        max_workers: int = 4,
+        rate_limit: float = 2.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_in_flight: int | None = None,
+        on_error: Callable[[Hashable, Exception], None] | None = None
+        ) -> Iterator[tuple[Hashable, T]]:
+    '''Yield `(key, result)` as fetches complete.
+
+    At most `max_in_flight` fetches are pending or unconsumed at once, so a
+    slow consumer holds back new requests instead of buffering results.
+    A fetch failing after its retries is reported, passed to `on_error`
+    and skipped.
+    '''
+    if max_in_flight is None:
+        max_in_flight = 2 * max_workers
+
+    limiter = RateLimiter(rate_limit)
+    pending_tasks = iter(tasks.items())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(total=len(tasks)) as progress:
+        futures = {}
+
+        def submit():
+            n_free = max_in_flight - len(futures)
+            for key, args in islice(pending_tasks, n_free):
+                future = executor.submit(
+                    fetch_with_retry,
+                    fetch,
+                    *args,
+                    limiter=limiter,
+                    max_retries=max_retries,
+                    backoff=backoff
+                )
+                futures[future] = key
+
+        submit()
+        while len(futures) > 0:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                progress.update(1)
+                try:
+                    result = future.result()
+                except Exception as error:
+                    tqdm.write(f'Failed to fetch {key}: {error!r}')
+                    if on_error is not None:
+                        on_error(key, error)
+                    continue
+                yield key, result
+            submit()
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import sqlite3
+from contextlib import contextmanager
+from peewee import Database, Field, Model
+from tqdm import tqdm
+
+from database import EpochDayField
+
+# Upper bound of rows written by one `executemany` call, so a multi-year
+# backfill is never materialised as Python tuples all at once.
+STREAM_ROWS = 50_000
+
+
+def get_max_variables(database: Database) -> int:
+    connection = database.connection()
+    try:
+        return connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:
+        return 999
+
+
+@contextmanager
+def bulk_load_pragmas(
+        database: Database,
+        cache_size: int = -256_000
+        ):
+    previous = {
+        'synchronous': database.pragma('synchronous'),
+        'cache_size': database.pragma('cache_size'),
+    }
+    database.pragma('journal_mode', 'wal')
+    database.pragma('synchronous', 'normal')
+    database.pragma('cache_size', cache_size)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            database.pragma(key, value)
+
+
+def _to_sql_column(values: pd.Series, field: Field) -> np.ndarray:
+    if isinstance(field, EpochDayField):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return (
+                values.to_numpy().astype('datetime64[D]').astype(np.int64)
+            )
+        return values.map(field.db_value).to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d').to_numpy()
+    return values.to_numpy()
+
+
+def _insert_sql(
+        table: str,
+        columns: list[str],
+        n_rows: int,
+        conflict: str = 'IGNORE'
+        ) -> str:
+    names = ', '.join(f'"{column}"' for column in columns)
+    row = '(' + ', '.join('?' * len(columns)) + ')'
+    values = ', '.join([row] * n_rows)
+    return f'INSERT OR {conflict} INTO "{table}" ({names}) VALUES {values}'
+
+
+def bulk_insert(
+        model: type[Model],
+        data: pd.DataFrame,
+        columns: list[str],
+        *,
+        database: Database,
+        chunk_size: int | None = None,
+        replace: bool = False,
+        required: list[str] | None = None
+        ) -> int:
+    # Existing rows are kept unless `replace`, and rows missing any of the
+    # `required` columns (all columns by default) are skipped
+    data = data[columns].dropna(subset=required)
+    if len(data) == 0:
+        return 0
+
+    # Pack as many rows into one statement as SQLite's variable limit allows
+    if chunk_size is None:
+        chunk_size = get_max_variables(database) // len(columns)
+    chunk_size = max(1, min(chunk_size, STREAM_ROWS))
+    chunk_values = chunk_size * len(columns)
+
+    table = model._meta.table_name
+    arrays = [
+        _to_sql_column(data[column], model._meta.columns[column])
+        for column in columns
+    ]
+    conflict = 'REPLACE' if replace else 'IGNORE'
+    sql = _insert_sql(table, columns, chunk_size, conflict)
+
+    with database.atomic(), tqdm(
+            total=len(data),
+            unit='row',
+            desc=table
+            ) as progress:
+        cursor = database.cursor()
+        for start in range(0, len(data), STREAM_ROWS):
+            values = [
+                value
+                for row in zip(*(
+                    array[start:start + STREAM_ROWS].tolist()
+                    for array in arrays
+                ))
+                for value in row
+            ]
+            n_full = len(values) // chunk_values
+            cursor.executemany(sql, (
+                values[i * chunk_values:(i + 1) * chunk_values]
+                for i in range(n_full)
+            ))
+
+            rest = values[n_full * chunk_values:]
+            if len(rest) > 0:
+                cursor.execute(
+                    _insert_sql(
+                        table,
+                        columns,
+                        len(rest) // len(columns),
+                        conflict
+                    ),
+                    rest
+                )
+            progress.update(len(values) // len(columns))
+
+    return len(data)
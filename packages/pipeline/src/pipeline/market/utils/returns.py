@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from peewee import Database
+
+from database import Currency, ReturnsDaily, Sector, Stock
+from database.columnar import currency_pair_key
+from database.query import (
+    read_currency_daily,
+    read_sector_index_daily,
+    read_stock_daily
+)
+
+from .loader import bulk_insert
+
+HORIZONS = {
+    'change_1d': 1,
+    'change_7d': 7,
+    'change_30d': 30,
+    'change_60d': 60,
+}
+LOOKBACK_DAYS = 70
+RETURNS_COLUMNS = ['asset_type', 'asset_code', 'date', *HORIZONS]
+
+
+def calculate_returns(close: pd.DataFrame) -> pd.DataFrame:
+    # Horizons are calendar days, each compared against the last close on
+    # or before the lagged day, for every asset at once
+    calendar = close.resample('D').last().ffill()
+    is_bar = close.notna().to_numpy()
+    rows, columns = np.nonzero(is_bar)
+
+    data = pd.DataFrame({
+        'asset_code': close.columns[columns],
+        'date': close.index[rows],
+    })
+    for name, lag in HORIZONS.items():
+        change = close / calendar.shift(lag).reindex(close.index) - 1
+        data[name] = change.to_numpy()[rows, columns]
+    return data
+
+
+def _to_close_matrix(data: pd.DataFrame) -> pd.DataFrame:
+    return (
+        data
+        .assign(date=lambda df: pd.to_datetime(df['date']))
+        .pivot(index='date', columns='asset_code', values='close')
+        .sort_index()
+    )
+
+
+def _query_stock_close(start_date: date) -> pd.DataFrame:
+    stock_codes = [code for code, in Stock.select(Stock.code).tuples()]
+    data = read_stock_daily(stock_codes, start_date, date.max)
+    return data.rename(columns={'stock_code': 'asset_code'})[
+        ['asset_code', 'date', 'close']
+    ].astype({'asset_code': str})
+
+
+def _query_sector_close(start_date: date) -> pd.DataFrame:
+    sector_codes = [code for code, in Sector.select(Sector.code).tuples()]
+    data = read_sector_index_daily(sector_codes, start_date, date.max)
+    return data.rename(columns={'sector_code': 'asset_code'})[
+        ['asset_code', 'date', 'close']
+    ].astype({'asset_code': str})
+
+
+def _query_currency_close(start_date: date) -> pd.DataFrame:
+    # The pipeline loads the pairs of every currency against USD
+    to_codes = [
+        code
+        for code, in (
+            Currency
+            .select(Currency.code)
+            .where(Currency.code != 'USD')
+            .tuples()
+        )
+    ]
+    data = [
+        read_currency_daily('USD', to_code, start_date, date.max)
+        .assign(asset_code=currency_pair_key('USD', to_code))
+        for to_code in to_codes
+    ]
+    if len(data) == 0:
+        return pd.DataFrame(columns=['asset_code', 'date', 'close'])
+    return pd.concat(data, ignore_index=True)[['asset_code', 'date', 'close']]
+
+
+def update_returns_daily(
+        start_date: date | None = None,
+        *,
+        database: Database
+        ) -> int:
+    '''Recompute the multi-horizon returns of every asset from `start_date` on.'''
+    lookback_date = date.min
+    if start_date is not None:
+        lookback_date = start_date - timedelta(days=LOOKBACK_DAYS)
+
+    data = []
+    for asset_type, query_close in (
+            (ReturnsDaily.STOCK, _query_stock_close),
+            (ReturnsDaily.SECTOR, _query_sector_close),
+            (ReturnsDaily.CURRENCY, _query_currency_close),
+            ):
+        close = query_close(lookback_date)
+        if len(close) == 0:
+            continue
+
+        returns = calculate_returns(_to_close_matrix(close))
+        if start_date is not None:
+            returns = returns.loc[returns['date'] >= pd.Timestamp(start_date)]
+        data.append(returns.assign(asset_type=asset_type))
+
+    if len(data) == 0:
+        return 0
+
+    return bulk_insert(
+        ReturnsDaily,
+        pd.concat(data, ignore_index=True),
+        RETURNS_COLUMNS,
+        database=database,
+        replace=True,
+        required=['asset_type', 'asset_code', 'date']
+    )
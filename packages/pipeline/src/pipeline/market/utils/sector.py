@@ -0,0 +1,78 @@
+import pandas as pd
+from datetime import date
+from peewee import Database, Select
+
+from database import Stock, SectorIndexDaily
+from database.plans import register_hot_query
+from database.query import read_stock_daily
+
+from .loader import bulk_insert
+
+
+def _sector_stocks_query() -> Select:
+    return (
+        Stock
+        .select(Stock.code, Stock.sector, Stock.volume)
+        .where(Stock.sector.is_null(False))
+    )
+
+
+def calculate_sector_index(
+        close: pd.DataFrame,
+        stocks: pd.DataFrame
+        ) -> pd.DataFrame:
+    '''Volume-weighted close of each sector per date, weighting the stocks
+    with a bar on that date by their volume.'''
+    data = close.merge(stocks, on='stock_code')
+    totals = (
+        data
+        .assign(close=data['close'] * data['volume'])
+        .groupby(['sector_code', 'date'])[['close', 'volume']]
+        .sum()
+    )
+    return (
+        (totals['close'] / totals['volume'])
+        .rename('close')
+        .reset_index()
+    )
+
+
+def update_sector_index_daily(
+        start_date: date | None = None,
+        *,
+        database: Database
+        ) -> int:
+    '''Recompute the volume-weighted sector indices from `start_date` on.'''
+    stocks = pd.DataFrame(
+        _sector_stocks_query().tuples(),
+        columns=['stock_code', 'sector_code', 'volume']
+    )
+    if len(stocks) == 0:
+        return 0
+
+    # The bars are read per stock along the primary key and grouped here,
+    # grouping by (sector, date) in SQL sorts every row in a temp b-tree
+    close = read_stock_daily(
+        stocks['stock_code'].tolist(),
+        date.min if start_date is None else start_date,
+        date.max,
+        database=database
+    )
+    data = calculate_sector_index(
+        close[['stock_code', 'date', 'close']].astype({'stock_code': str}),
+        stocks
+    )
+    return bulk_insert(
+        SectorIndexDaily,
+        data,
+        ['sector_code', 'date', 'close'],
+        database=database,
+        replace=True
+    )
+
+
+register_hot_query(
+    'update_sector_index_daily_stocks',
+    _sector_stocks_query,
+    allow=('stock_sector_code_code_volume', )
+)
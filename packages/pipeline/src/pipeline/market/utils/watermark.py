@@ -0,0 +1,79 @@
+from datetime import date
+from peewee import Select, fn
+
+from database import StockDaily, SectorIndexDaily, ReturnsDaily, CurrencyDaily
+from database.plans import register_hot_query
+
+
+def _stock_watermarks_query(stock_codes: list[str]) -> Select:
+    return (
+        StockDaily
+        .select(
+            StockDaily.stock_code,
+            fn.MAX(StockDaily.date).alias('date')
+        )
+        .where(StockDaily.stock_code.in_(stock_codes))
+        .group_by(StockDaily.stock_code)
+    )
+
+
+def load_stock_watermarks(
+        stock_codes: list[str]
+        ) -> dict[str, date]:
+    return dict(_stock_watermarks_query(stock_codes).tuples())
+
+
+def _sector_index_watermark_query() -> Select:
+    return SectorIndexDaily.select(fn.MAX(SectorIndexDaily.date))
+
+
+def load_sector_index_watermark() -> date | None:
+    return _sector_index_watermark_query().scalar()
+
+
+def _returns_watermark_query() -> Select:
+    return ReturnsDaily.select(fn.MAX(ReturnsDaily.date))
+
+
+def load_returns_watermark() -> date | None:
+    return _returns_watermark_query().scalar()
+
+
+def load_currency_watermarks(
+        currency_pairs: list[tuple[str, str]]
+        ) -> dict[tuple[str, str], date]:
+    from_codes = {from_code for from_code, _ in currency_pairs}
+    to_codes = {to_code for _, to_code in currency_pairs}
+    query = (
+        CurrencyDaily
+        .select(
+            CurrencyDaily.from_currency_code,
+            CurrencyDaily.to_currency_code,
+            fn.MAX(CurrencyDaily.date).alias('date')
+        )
+        .where(
+            CurrencyDaily.from_currency_code.in_(from_codes)
+            & CurrencyDaily.to_currency_code.in_(to_codes)
+        )
+        .group_by(
+            CurrencyDaily.from_currency_code,
+            CurrencyDaily.to_currency_code
+        )
+        .tuples()
+    )
+    return {
+        (from_code, to_code): last_date
+        for from_code, to_code, last_date in query
+        if (from_code, to_code) in currency_pairs
+    }
+
+
+register_hot_query(
+    'load_stock_watermarks',
+    lambda: _stock_watermarks_query(['S0000.JK', 'S0001.JK'])
+)
+register_hot_query(
+    'load_sector_index_watermark',
+    _sector_index_watermark_query
+)
+register_hot_query('load_returns_watermark', _returns_watermark_query)
@@ -0,0 +1,97 @@
+import pandas as pd
+import threading
+import yfinance as yf
+from datetime import datetime
+from yfinance import shared
+from yfinance.exceptions import YFPricesMissingError
+
+# `yf.download` collects its results in module-level state, so only one
+# multi-ticker download may run at a time. It still fetches the tickers of
+# a batch in parallel with its own threads.
+_DOWNLOAD_LOCK = threading.Lock()
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class DownloadError(Exception):
+    '''Tickers Yahoo failed to return, with the error of each.'''
+
+    def __init__(self, errors: dict[str, str]):
+        super().__init__(
+            ', '.join(f'{ticker}: {error}' for ticker, error in errors.items())
+        )
+        self.errors = errors
+
+
+def is_no_bars_error(error: str) -> bool:
+    # Yahoo answers a range without trades with "no price data found", the
+    # same error as a failed request minus its status code or error text
+    return 'no price data found' in error and 'Yahoo' not in error
+
+
+def localize_index(data: pd.DataFrame) -> pd.DataFrame:
+    if isinstance(data.index, pd.DatetimeIndex) \
+            and data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    data.index.name = 'Date'
+    return data
+
+
+def history_daily(
+        ticker: str,
+        start_datetime: datetime | None = None,
+        end_datetime: datetime | None = None
+        ) -> pd.DataFrame:
+    # Single tickers go through `Ticker.history`, which is safe to call
+    # from concurrent workers unlike `yf.download`. Failures are raised
+    # instead of logged, so they are retried and checkpointed as failed.
+    try:
+        data = yf.Ticker(ticker).history(
+            start=start_datetime,
+            end=end_datetime,
+            actions=False,
+            raise_errors=True
+        )
+    except YFPricesMissingError as error:
+        if not is_no_bars_error(str(error)):
+            raise
+        data = pd.DataFrame(
+            columns=PRICE_COLUMNS,
+            index=pd.DatetimeIndex([], name='Date')
+        )
+    return localize_index(data)
+
+
+def download_daily(
+        tickers: list[str],
+        start_datetime: datetime | None = None,
+        end_datetime: datetime | None = None
+        ) -> pd.DataFrame:
+    with _DOWNLOAD_LOCK:
+        data = yf.download(
+            tickers,
+            start=start_datetime,
+            end=end_datetime,
+            group_by='ticker',
+            progress=False
+        )
+        # A failed ticker comes back as all-NaN columns, its error is only
+        # kept in `shared._ERRORS` until the next download
+        errors = {
+            ticker: shared._ERRORS[ticker.upper()]
+            for ticker in tickers
+            if ticker.upper() in shared._ERRORS
+            and not is_no_bars_error(shared._ERRORS[ticker.upper()])
+        }
+    if len(errors) > 0:
+        raise DownloadError(errors)
+
+    # Wide (Ticker, Price) columns to one row per ticker and date
+    data = (
+        data
+        .stack(level='Ticker', future_stack=True)
+        .dropna(how='all')
+        .reset_index(level='Ticker')
+        .rename_axis(columns=None)
+    )
+    return localize_index(data)
@@ -0,0 +1,26 @@
+import sys
+from argparse import Namespace
+
+from database import enable_debug
+from database.plans import HOT_QUERIES, check_query_plans
+
+# Importing the modules registers their hot queries
+import database.latest  # noqa: F401
+import database.query  # noqa: F401
+import pipeline.market.utils.sector  # noqa: F401
+import pipeline.market.utils.watermark  # noqa: F401
+
+
+def run_check_plans(args: Namespace):
+    if args.debug:
+        enable_debug()
+
+    problems = check_query_plans()
+    for name in HOT_QUERIES:
+        status = 'FAIL' if len(problems[name]) > 0 else 'OK'
+        print(f'{status} {name}')
+        for detail in problems[name]:
+            print(f'    {detail}')
+
+    if any(len(details) > 0 for details in problems.values()):
+        sys.exit(1)
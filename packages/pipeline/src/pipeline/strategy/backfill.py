@@ -0,0 +1,112 @@
+import pandas as pd
+from argparse import Namespace
+from datetime import datetime
+from peewee import Database
+
+from database import (
+    StrategyEvaluation,
+    bump_data_version, connect_database, enable_debug
+)
+
+from pipeline.backtest.run import extract_universe
+from pipeline.market.utils.loader import bulk_insert
+
+from .batch import (
+    EVALUATION_COLUMNS,
+    EVALUATION_KEYS,
+    calculate_evaluations,
+    to_evaluation_records
+)
+from .utils.data import get_stocks_daily_close
+
+
+def _get_existing_evaluations(
+        stock_codes: list[str],
+        start_date: datetime,
+        end_date: datetime
+        ) -> pd.DataFrame:
+    data = pd.DataFrame(
+        StrategyEvaluation
+        .select(
+            StrategyEvaluation.strategy_id,
+            StrategyEvaluation.stock_code,
+            StrategyEvaluation.date
+        )
+        .where(
+            StrategyEvaluation.stock_code.in_(stock_codes)
+            & (StrategyEvaluation.date >= start_date)
+            & (StrategyEvaluation.date <= end_date)
+        )
+        .tuples(),
+        columns=['strategy_id', 'stock_code', 'date']
+    )
+    data['date'] = pd.to_datetime(data['date'])
+    return data
+
+
+def backfill_evaluations(
+        stock_codes: list[str],
+        start_date: datetime,
+        end_date: datetime,
+        *,
+        database: Database,
+        replace: bool = False
+        ) -> int:
+    # Indicators need the history before `start_date` to warm up, each
+    # stock over its own bars only (see `calculate_evaluations`)
+    close = get_stocks_daily_close(stock_codes, datetime.min, end_date)
+    if close.empty:
+        return 0
+
+    mask = close.notna()
+    mask.loc[close.index < start_date] = False
+    records = to_evaluation_records(calculate_evaluations(close), mask)
+
+    # Existing evaluations are kept unless `replace` rewrites them
+    if not replace:
+        existing = _get_existing_evaluations(
+            stock_codes,
+            start_date,
+            end_date
+        )
+        records = (
+            records
+            .merge(
+                existing,
+                on=['strategy_id', 'stock_code', 'date'],
+                how='left',
+                indicator=True
+            )
+            .loc[lambda df: df['_merge'].eq('left_only'), EVALUATION_COLUMNS]
+        )
+    return bulk_insert(
+        StrategyEvaluation,
+        records,
+        EVALUATION_COLUMNS,
+        database=database,
+        replace=replace,
+        required=EVALUATION_KEYS
+    )
+
+
+def run_backfill_strategy_pipeline(args: Namespace):
+    if args.debug:
+        enable_debug()
+
+    db = connect_database()
+
+    start_date = datetime.fromisoformat(args.start_date)
+    if args.end_date is None:
+        end_date = datetime.now()
+    else:
+        end_date = datetime.fromisoformat(args.end_date)
+
+    stock_codes = extract_universe(args.universe)
+    backfill_evaluations(
+        stock_codes,
+        start_date,
+        end_date,
+        database=db,
+        replace=args.replace
+    )
+    bump_data_version()
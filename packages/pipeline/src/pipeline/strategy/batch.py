@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from peewee import Database
+
+from database import Stock, StrategyEvaluation
+
+from pipeline.market.utils.loader import bulk_insert
+
+from .init import Strategy
+from .utils.data import get_stocks_daily_close
+from .utils.bollinger import calculate_bollinger_bands_matrix
+from .utils.donchian import calculate_donchian_channel_matrix
+from .utils.rsi import calculate_rsi_matrix
+from .utils.signal import SIGNAL_LABELS
+
+EVALUATION_KEYS = ['strategy_id', 'stock_code', 'date', 'signal']
+EVALUATION_COLUMNS = [*EVALUATION_KEYS, *StrategyEvaluation.METRICS]
+
+
+def to_evaluation_row(evaluation: dict) -> dict:
+    # Metrics the strategy does not have are left NULL
+    row = dict.fromkeys(StrategyEvaluation.METRICS)
+    row.update({
+        name: value
+        for name, value in evaluation.items()
+        if name in row
+    })
+    row['signal'] = SIGNAL_LABELS.index(evaluation['signal'])
+    return row
+
+
+def pack_bars(close: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    '''Move every stock's bars down to consecutive rows ending at the last
+    row, so the gaps one stock has on dates others traded never reach its
+    rolling windows. Also returns the packed row of every cell of `close`.'''
+    is_bar = close.notna().to_numpy()
+    rows = np.cumsum(is_bar, axis=0) - 1 + (len(close) - is_bar.sum(axis=0))
+    columns = np.broadcast_to(np.arange(close.shape[1]), close.shape)
+
+    values = np.full(close.shape, np.nan)
+    values[rows[is_bar], columns[is_bar]] = close.to_numpy()[is_bar]
+    return pd.DataFrame(values, columns=close.columns), rows
+
+
+def unpack_bars(
+        packed: pd.DataFrame,
+        rows: np.ndarray,
+        close: pd.DataFrame
+        ) -> pd.DataFrame:
+    # Dates a stock has no bar for are left NaN, or Hold for signal codes
+    values = packed.to_numpy()
+    columns = np.broadcast_to(np.arange(close.shape[1]), close.shape)
+    return pd.DataFrame(
+        np.where(
+            close.notna().to_numpy(),
+            values[np.clip(rows, 0, None), columns],
+            np.nan if values.dtype.kind == 'f' else 0
+        ).astype(values.dtype),
+        index=close.index,
+        columns=close.columns
+    )
+
+
+def calculate_evaluations(
+        close: pd.DataFrame,
+        window: int = 20,
+        lower_threshold: int = 30,
+        upper_threshold: int = 70
+        ) -> dict[Strategy, dict[str, pd.DataFrame | int]]:
+    packed, rows = pack_bars(close)
+    bollinger_bands = calculate_bollinger_bands_matrix(packed, window)
+    donchian_channel = calculate_donchian_channel_matrix(packed, window)
+    rsi = calculate_rsi_matrix(packed, lower_threshold, upper_threshold)
+
+    # Evaluation fields in the order they are serialised
+    evaluations = {
+        Strategy.BOLLINGER_BANDS: {
+            'window': window,
+            'signal': bollinger_bands['signal'],
+            'current_price': packed,
+            'upper_band': bollinger_bands['upper_band'],
+            'lower_band': bollinger_bands['lower_band'],
+            'bandwidth': bollinger_bands['bandwidth'],
+            'bandwidth_change': (
+                bollinger_bands['bandwidth']
+                / bollinger_bands['bandwidth'].shift(window)
+                - 1
+            ),
+        },
+        Strategy.DONCHIAN_CHANNEL: {
+            'window': window,
+            'signal': donchian_channel['signal'],
+            'current_price': packed,
+            'rolling_max': donchian_channel['rolling_max'],
+            'rolling_min': donchian_channel['rolling_min'],
+            'rolling_range': donchian_channel['rolling_range'],
+        },
+        Strategy.RELATIVE_STRENGTH_INDEX: {
+            'lower_threshold': lower_threshold,
+            'upper_threshold': upper_threshold,
+            'rsi': rsi['rsi'],
+            'rsi_shifted': rsi['rsi_shifted'],
+            'signal': rsi['signal'],
+            'current_price': packed,
+        },
+    }
+    return {
+        strategy: {
+            name: (
+                unpack_bars(field, rows, close)
+                if isinstance(field, pd.DataFrame)
+                else field
+            )
+            for name, field in fields.items()
+        }
+        for strategy, fields in evaluations.items()
+    }
+
+
+def to_evaluation_records(
+        evaluations: dict[Strategy, dict[str, pd.DataFrame | int]],
+        mask: pd.DataFrame
+        ) -> pd.DataFrame:
+    rows, columns = np.nonzero(mask.to_numpy())
+    dates = mask.index[rows]
+    stock_codes = mask.columns[columns]
+
+    records = []
+    for strategy, fields in evaluations.items():
+        values = {}
+        for name, field in fields.items():
+            if isinstance(field, pd.DataFrame):
+                values[name] = field.to_numpy()[rows, columns]
+            else:
+                values[name] = np.full(len(rows), field)
+
+        records.append(pd.DataFrame({
+            'strategy_id': strategy.value,
+            'stock_code': stock_codes,
+            'date': dates,
+            **values,
+        }))
+    return pd.concat(records, ignore_index=True) \
+        .reindex(columns=EVALUATION_COLUMNS)
+
+
+def evaluate_watchlist(
+        stocks: list[Stock],
+        *,
+        database: Database,
+        window: int = 20,
+        lower_threshold: int = 30,
+        upper_threshold: int = 70,
+        ) -> pd.DataFrame:
+    close = get_stocks_daily_close(
+        [stock.code for stock in stocks],
+        start_date=datetime.now() - timedelta(days=60)
+    )
+    if close.empty:
+        return pd.DataFrame()
+
+    # Every stock is evaluated at its own latest bar
+    is_bar = close.notna()
+    mask = is_bar & is_bar.iloc[::-1].cumsum().iloc[::-1].eq(1)
+
+    records = to_evaluation_records(
+        calculate_evaluations(close, window, lower_threshold, upper_threshold),
+        mask
+    )
+    bulk_insert(
+        StrategyEvaluation,
+        records,
+        EVALUATION_COLUMNS,
+        database=database,
+        required=EVALUATION_KEYS
+    )
+    return records
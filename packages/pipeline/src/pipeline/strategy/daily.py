@@ -1,18 +1,18 @@
-import json
 import pandas as pd
 from argparse import Namespace
 from datetime import datetime, timedelta
 from peewee import Database
-from tqdm import tqdm
 
 from database import (
     Stock,
     StrategyEvaluation,
-    connect_database, enable_debug
+    bump_data_version, connect_database, enable_debug
 )
 
 from pipeline.market.daily import extract_stock_watchlist
 
+from .batch import evaluate_watchlist, to_evaluation_row
+from .incremental import evaluate_watchlist_incremental
 from .init import Strategy
 from .utils.data import get_stock_daily_data
 from .utils.bollinger import calculate_bollinger_bands
@@ -57,7 +57,7 @@ def evaluate_bollinger_bands(
                 strategy_id=Strategy.BOLLINGER_BANDS.value,
                 stock=stock,
                 date=current_bb.name.strftime('%Y-%m-%d'),
-                evaluation=json.dumps(evaluation)
+                **to_evaluation_row(evaluation)
             )
             .on_conflict_ignore()
             .execute()
@@ -95,7 +95,7 @@ def evaluate_donchian_channel(
                 strategy_id=Strategy.DONCHIAN_CHANNEL.value,
                 stock=stock,
                 date=current_donchian.name.strftime('%Y-%m-%d'),
-                evaluation=json.dumps(evaluation)
+                **to_evaluation_row(evaluation)
             )
             .on_conflict_ignore()
             .execute()
@@ -136,7 +136,7 @@ def evaluate_rsi(
                 strategy_id=Strategy.RELATIVE_STRENGTH_INDEX.value,
                 stock=stock,
                 date=current_rsi.name.strftime('%Y-%m-%d'),
-                evaluation=json.dumps(evaluation)
+                **to_evaluation_row(evaluation)
             )
             .on_conflict_ignore()
             .execute()
@@ -153,7 +153,8 @@ def run_daily_strategy_pipeline(args: Namespace):
 
     username = 'default'
     stocks = extract_stock_watchlist(username)
-    for stock in tqdm(stocks):
-        evaluate_bollinger_bands(stock, database=db)
-        evaluate_donchian_channel(stock, database=db)
-        evaluate_rsi(stock, database=db)
+    if args.strategy_engine == 'incremental':
+        evaluate_watchlist_incremental(stocks, database=db)
+    else:
+        evaluate_watchlist(stocks, database=db)
+    bump_data_version()
@@ -0,0 +1,210 @@
+import json
+import pandas as pd
+from datetime import date, timedelta
+from peewee import Database
+
+from database import (
+    IndicatorState as IndicatorStateModel,
+    Stock,
+    StrategyEvaluation
+)
+from database.query import read_stock_daily
+
+from pipeline.market.utils.loader import bulk_insert
+
+from .batch import EVALUATION_COLUMNS, EVALUATION_KEYS, to_evaluation_row
+from .init import Strategy
+from .utils.incremental import (
+    IndicatorState,
+    BollingerState,
+    DonchianState,
+    RSIState
+)
+
+
+def _create_states(
+        window: int,
+        lower_threshold: int,
+        upper_threshold: int
+        ) -> dict[Strategy, IndicatorState]:
+    return {
+        Strategy.BOLLINGER_BANDS: BollingerState(window),
+        Strategy.DONCHIAN_CHANNEL: DonchianState(window),
+        Strategy.RELATIVE_STRENGTH_INDEX: RSIState(
+            lower_threshold=lower_threshold,
+            upper_threshold=upper_threshold
+        ),
+    }
+
+
+def _load_states(
+        stock_codes: list[str],
+        **params
+        ) -> dict[str, tuple[date, int, dict[Strategy, IndicatorState]]]:
+    rows = (
+        IndicatorStateModel
+        .select()
+        .where(IndicatorStateModel.stock_code.in_(stock_codes))
+    )
+    stored = {}
+    for row in rows:
+        stored.setdefault(row.stock_code, {})[Strategy(row.strategy_id)] = row
+
+    states = {}
+    for stock_code, rows in stored.items():
+        fresh = _create_states(**params)
+        markers = {(row.date, row.bar_count) for row in rows.values()}
+        # The strategies of a stock are always saved together, anything
+        # else (or changed parameters) means the state has to be rebuilt
+        if rows.keys() != fresh.keys() or len(markers) != 1:
+            continue
+
+        loaded = {}
+        for strategy, row in rows.items():
+            state = json.loads(row.state)
+            if not fresh[strategy].matches(state):
+                break
+            loaded[strategy] = type(fresh[strategy]).from_dict(state)
+        else:
+            last_date, bar_count = markers.pop()
+            states[stock_code] = (last_date, bar_count, loaded)
+    return states
+
+
+def invalidate_indicator_states(data: pd.DataFrame):
+    '''Drop the states of stocks with bars loaded on or before their state
+    date, a backfill the stored bar count has not seen.'''
+    if len(data) == 0:
+        return
+
+    first_dates = (
+        pd.to_datetime(data['date'])
+        .groupby(data['stock_code'])
+        .min()
+    )
+    stale = [
+        stock_code
+        for stock_code, state_date in (
+            IndicatorStateModel
+            .select(IndicatorStateModel.stock_code, IndicatorStateModel.date)
+            .where(IndicatorStateModel.stock_code.in_(list(first_dates.index)))
+            .distinct()
+            .tuples()
+        )
+        if first_dates[stock_code] <= pd.Timestamp(state_date)
+    ]
+    if len(stale) == 0:
+        return
+
+    (
+        IndicatorStateModel
+        .delete()
+        .where(IndicatorStateModel.stock_code.in_(stale))
+        .execute()
+    )
+
+
+def _get_new_bars(
+        stock_codes: list[str],
+        since: dict[str, date]
+        ) -> pd.DataFrame:
+    # Stocks without a state are rebuilt from their whole history, the
+    # rest only read from the oldest watermark and drop what they have seen
+    rebuilt = [code for code in stock_codes if code not in since]
+    updated = [code for code in stock_codes if code in since]
+
+    data = []
+    if len(rebuilt) > 0:
+        data.append(read_stock_daily(rebuilt, date.min, date.max))
+    if len(updated) > 0:
+        new_bars = read_stock_daily(
+            updated,
+            min(since.values()) + timedelta(days=1),
+            date.max
+        )
+        watermark = pd.to_datetime(
+            new_bars['stock_code'].map(since).astype(object)
+        )
+        data.append(new_bars.loc[new_bars['date'] > watermark])
+    if len(data) == 0:
+        return pd.DataFrame(columns=['stock_code', 'date', 'close'])
+
+    return (
+        pd.concat(
+            [bars.astype({'stock_code': str}) for bars in data],
+            ignore_index=True
+        )
+        [['stock_code', 'date', 'close']]
+    )
+
+
+def evaluate_watchlist_incremental(
+        stocks: list[Stock],
+        *,
+        database: Database,
+        window: int = 20,
+        lower_threshold: int = 30,
+        upper_threshold: int = 70,
+        ) -> pd.DataFrame:
+    params = {
+        'window': window,
+        'lower_threshold': lower_threshold,
+        'upper_threshold': upper_threshold,
+    }
+    stock_codes = [stock.code for stock in stocks]
+
+    states = _load_states(stock_codes, **params)
+
+    bars = _get_new_bars(
+        stock_codes,
+        {stock_code: state[0] for stock_code, state in states.items()}
+    )
+
+    evaluations = []
+    updated_states = []
+    for stock_code, stock_bars in bars.groupby('stock_code', sort=False):
+        if stock_code in states:
+            _, bar_count, indicators = states[stock_code]
+        else:
+            bar_count, indicators = 0, _create_states(**params)
+
+        for close in stock_bars['close'].tolist():
+            for indicator in indicators.values():
+                indicator.update(close)
+
+        last_date = stock_bars['date'].iloc[-1]
+        bar_count += len(stock_bars)
+        for strategy, indicator in indicators.items():
+            evaluations.append({
+                'strategy_id': strategy.value,
+                'stock_code': stock_code,
+                'date': last_date,
+                **to_evaluation_row(indicator.evaluate(close)),
+            })
+            updated_states.append({
+                'strategy_id': strategy.value,
+                'stock_code': stock_code,
+                'date': last_date,
+                'bar_count': bar_count,
+                'state': json.dumps(indicator.to_dict()),
+            })
+
+    if len(evaluations) == 0:
+        return pd.DataFrame()
+
+    evaluations = pd.DataFrame(evaluations)
+    bulk_insert(
+        StrategyEvaluation,
+        evaluations,
+        EVALUATION_COLUMNS,
+        database=database,
+        required=EVALUATION_KEYS
+    )
+    with database.atomic():
+        (
+            IndicatorStateModel
+            .insert_many(updated_states)
+            .on_conflict_replace()
+            .execute()
+        )
+    return evaluations
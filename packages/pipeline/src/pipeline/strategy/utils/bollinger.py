@@ -1,13 +1,7 @@
 import pandas as pd
 import ta
 
-
-def _evaluate_signal(row: pd.Series) -> str:
-    if row['close'] < row['lower_band']:
-        return 'Buy'
-    elif row['close'] > row['upper_band']:
-        return 'Sell'
-    return 'Hold'
+from .signal import select_signal, select_signal_codes
 
 
 def calculate_bollinger_bands(
@@ -23,6 +17,33 @@ def calculate_bollinger_bands(
     data['upper_band'] = bb.bollinger_hband()
     data['lower_band'] = bb.bollinger_lband()
     data['bandwidth'] = data['upper_band'] - data['lower_band']
-    data['signal'] = data.apply(_evaluate_signal, axis=1)
+    data['signal'] = select_signal(
+        data.index,
+        buy=data['close'] < data['lower_band'],
+        sell=data['close'] > data['upper_band']
+    )
     data = data.drop('close', axis=1)
     return data
+
+
+def calculate_bollinger_bands_matrix(
+        close: pd.DataFrame,
+        window: int = 20,
+        window_dev: int = 2
+        ) -> dict[str, pd.DataFrame]:
+    rolling = close.rolling(window, min_periods=window)
+    mavg = rolling.mean()
+    mstd = rolling.std(ddof=0)
+
+    upper_band = mavg + window_dev * mstd
+    lower_band = mavg - window_dev * mstd
+    return {
+        'upper_band': upper_band,
+        'lower_band': lower_band,
+        'bandwidth': upper_band - lower_band,
+        'signal': pd.DataFrame(
+            select_signal_codes(close < lower_band, close > upper_band),
+            index=close.index,
+            columns=close.columns
+        ),
+    }
@@ -1,7 +1,36 @@
 import pandas as pd
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable
 
-from database import connect_database, Stock, StockDaily
+from database import connect_database, Stock
+from database.query import read_stock_daily
+from database.columnar import STOCK_DAILY, get_columnar_store
+
+CACHE_SIZE = 256
+
+_cache: OrderedDict[tuple[str, date, date], pd.DataFrame] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _to_date(value: date | datetime) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def invalidate_stock_daily_data(
+        stock_codes: Iterable[str] | None = None
+        ):
+    with _cache_lock:
+        if stock_codes is None:
+            _cache.clear()
+            return
+
+        stock_codes = set(stock_codes)
+        for key in [key for key in _cache if key[0] in stock_codes]:
+            del _cache[key]
 
 
 def get_stock_daily_data(
@@ -9,29 +38,76 @@ def get_stock_daily_data(
         start_date: datetime,
         end_date: datetime | None = None
         )-> pd.DataFrame:
+    if end_date is None:
+        end_date = datetime.now()
+
+    # Bars are daily, so windows are cached with day granularity
+    key = (stock_code, _to_date(start_date), _to_date(end_date))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key].copy()
+
+    data = _query_stock_daily_data(*key)
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data.copy()
+
+
+def _query_stock_daily_data(
+        stock_code: str,
+        start_date: date,
+        end_date: date
+        ) -> pd.DataFrame:
+    store = get_columnar_store()
+    if store is not None and store.has(STOCK_DAILY, stock_code):
+        data = store.read_one(STOCK_DAILY, stock_code, start_date, end_date)
+    else:
+        if Stock._meta.database is None:
+            connect_database()
+
+        data = read_stock_daily([stock_code], start_date, end_date) \
+            .drop(columns='stock_code')
+    return data.set_index(data['date'])
+
+
+def get_stocks_daily_close(
+        stock_codes: list[str],
+        start_date: datetime,
+        end_date: datetime | None = None
+        ) -> pd.DataFrame:
     if Stock._meta.database is None:
         connect_database()
 
     if end_date is None:
         end_date = datetime.now()
 
-    stock = Stock.select().where(Stock.code == stock_code).get()
-
-    data = pd.DataFrame(
-        StockDaily
-        .select()
-        .where(
-            (StockDaily.stock == stock)
-            & (StockDaily.date >= start_date)
-            & (StockDaily.date <= end_date)
+    store = get_columnar_store()
+    if store is not None and all(
+            store.has(STOCK_DAILY, stock_code)
+            for stock_code in stock_codes
+            ):
+        data = store.read(
+            STOCK_DAILY,
+            stock_codes,
+            start_date,
+            end_date,
+            key_column='stock_code'
         )
-        .order_by(StockDaily.date)
-        .dicts()
-    )
+        if data.empty:
+            return pd.DataFrame()
+        return (
+            data
+            .pivot(index='date', columns='stock_code', values='close')
+            .sort_index()
+        )
+
     data = (
-        data
-        .assign(date=lambda df: pd.to_datetime(df['date']))
-        .set_index(data['date'])
-        [['date', 'open', 'high', 'low', 'close', 'volume']]
+        read_stock_daily(stock_codes, start_date, end_date)
+        .pivot(index='date', columns='stock_code', values='close')
+        .sort_index()
     )
+    data.columns = data.columns.astype(str)
     return data
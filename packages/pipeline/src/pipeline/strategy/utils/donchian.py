@@ -1,11 +1,7 @@
 import pandas as pd
 
-def _evaluate_signal(row: pd.Series) -> str:
-    if row['close'] < row['rolling_min']:
-        return 'Sell'
-    elif row['close'] > row['rolling_max']:
-        return 'Buy'
-    return 'Hold'
+from .signal import select_signal, select_signal_codes
+
 
 def calculate_donchian_channel(
         data: pd.DataFrame,
@@ -16,7 +12,30 @@ def calculate_donchian_channel(
     data['rolling_max'] = data['close'].rolling(window=window).max()
     data['rolling_min'] = data['close'].rolling(window=window).min()
     data['rolling_range'] = data['rolling_max'] - data['rolling_min']
-    data['signal'] = data.apply(_evaluate_signal, axis=1)
+    data['signal'] = select_signal(
+        data.index,
+        buy=data['close'] > data['rolling_max'],
+        sell=data['close'] < data['rolling_min']
+    )
     data = data.drop('close', axis=1)
     
-    return data
\ No newline at end of file
+    return data
+
+
+def calculate_donchian_channel_matrix(
+        close: pd.DataFrame,
+        window: int = 20
+        ) -> dict[str, pd.DataFrame]:
+    rolling = close.rolling(window=window)
+    rolling_max = rolling.max()
+    rolling_min = rolling.min()
+    return {
+        'rolling_max': rolling_max,
+        'rolling_min': rolling_min,
+        'rolling_range': rolling_max - rolling_min,
+        'signal': pd.DataFrame(
+            select_signal_codes(close > rolling_max, close < rolling_min),
+            index=close.index,
+            columns=close.columns
+        ),
+    }
@@ -0,0 +1,254 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+from .signal import SIGNAL_LABELS, Signal
+
+NAN = float('nan')
+
+
+def _label(buy: bool, sell: bool) -> str:
+    if buy:
+        return SIGNAL_LABELS[Signal.BUY]
+    elif sell:
+        return SIGNAL_LABELS[Signal.SELL]
+    return SIGNAL_LABELS[Signal.HOLD]
+
+
+class IndicatorState(ABC):
+    '''Indicator folded one bar at a time and persisted between runs.'''
+
+    params: tuple[str, ...] = ()
+
+    @abstractmethod
+    def update(self, close: float):
+        ...
+
+    @abstractmethod
+    def evaluate(self, close: float) -> dict:
+        ...
+
+    @abstractmethod
+    def to_dict(self) -> dict:
+        ...
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls, state: dict) -> 'IndicatorState':
+        ...
+
+    def matches(self, state: dict) -> bool:
+        return all(
+            state.get(param) == getattr(self, param)
+            for param in self.params
+        )
+
+
+class BollingerState(IndicatorState):
+    params = ('window', 'window_dev')
+
+    def __init__(self, window: int = 20, window_dev: int = 2):
+        self.window = window
+        self.window_dev = window_dev
+        self.closes = deque(maxlen=window)
+        self.bandwidths = deque(maxlen=window + 1)
+        self.upper_band = NAN
+        self.lower_band = NAN
+
+    def update(self, close: float):
+        self.closes.append(close)
+
+        if len(self.closes) < self.window:
+            self.upper_band = self.lower_band = NAN
+        else:
+            # Summed from the window on every bar, running sums would carry
+            # their rounding error for as long as the state lives
+            mean = math.fsum(self.closes) / self.window
+            variance = math.fsum(
+                (value - mean) ** 2 for value in self.closes
+            ) / self.window
+            std = math.sqrt(variance)
+            self.upper_band = mean + self.window_dev * std
+            self.lower_band = mean - self.window_dev * std
+        self.bandwidths.append(self.upper_band - self.lower_band)
+
+    def evaluate(self, close: float) -> dict:
+        bandwidth = self.bandwidths[-1]
+        if len(self.bandwidths) > self.window:
+            bandwidth_change = bandwidth / self.bandwidths[0] - 1
+        else:
+            bandwidth_change = NAN
+
+        return {
+            'window': self.window,
+            'signal': _label(close < self.lower_band, close > self.upper_band),
+            'current_price': close,
+            'upper_band': self.upper_band,
+            'lower_band': self.lower_band,
+            'bandwidth': bandwidth,
+            'bandwidth_change': bandwidth_change,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'window': self.window,
+            'window_dev': self.window_dev,
+            'closes': list(self.closes),
+            'bandwidths': list(self.bandwidths),
+            'upper_band': self.upper_band,
+            'lower_band': self.lower_band,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'BollingerState':
+        indicator = cls(state['window'], state['window_dev'])
+        indicator.closes.extend(state['closes'])
+        indicator.bandwidths.extend(state['bandwidths'])
+        indicator.upper_band = state['upper_band']
+        indicator.lower_band = state['lower_band']
+        return indicator
+
+
+class DonchianState(IndicatorState):
+    params = ('window',)
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.count = 0
+        # Monotonic deques of (bar number, close)
+        self.maxima = deque()
+        self.minima = deque()
+
+    def update(self, close: float):
+        while self.maxima and self.maxima[-1][1] <= close:
+            self.maxima.pop()
+        self.maxima.append((self.count, close))
+        while self.minima and self.minima[-1][1] >= close:
+            self.minima.pop()
+        self.minima.append((self.count, close))
+
+        expired = self.count - self.window
+        if self.maxima[0][0] <= expired:
+            self.maxima.popleft()
+        if self.minima[0][0] <= expired:
+            self.minima.popleft()
+        self.count += 1
+
+    def evaluate(self, close: float) -> dict:
+        if self.count < self.window:
+            rolling_max = rolling_min = NAN
+        else:
+            rolling_max = self.maxima[0][1]
+            rolling_min = self.minima[0][1]
+
+        return {
+            'window': self.window,
+            'signal': _label(close > rolling_max, close < rolling_min),
+            'current_price': close,
+            'rolling_max': rolling_max,
+            'rolling_min': rolling_min,
+            'rolling_range': rolling_max - rolling_min,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'window': self.window,
+            'count': self.count,
+            'maxima': list(self.maxima),
+            'minima': list(self.minima),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'DonchianState':
+        indicator = cls(state['window'])
+        indicator.count = state['count']
+        indicator.maxima.extend(map(tuple, state['maxima']))
+        indicator.minima.extend(map(tuple, state['minima']))
+        return indicator
+
+
+class RSIState(IndicatorState):
+    params = ('window', 'lower_threshold', 'upper_threshold')
+
+    def __init__(
+            self,
+            window: int = 14,
+            lower_threshold: int = 30,
+            upper_threshold: int = 70
+            ):
+        self.window = window
+        self.lower_threshold = lower_threshold
+        self.upper_threshold = upper_threshold
+        self.count = 0
+        self.previous_close = NAN
+        self.average_gain = 0.0
+        self.average_loss = 0.0
+        self.rsi = NAN
+        self.rsi_shifted = NAN
+
+    def update(self, close: float):
+        # Wilder smoothing, matching `ta.momentum.RSIIndicator`
+        change = close - self.previous_close if self.count > 0 else 0.0
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+        if self.count == 0:
+            self.average_gain = gain
+            self.average_loss = loss
+        else:
+            alpha = 1 / self.window
+            self.average_gain += alpha * (gain - self.average_gain)
+            self.average_loss += alpha * (loss - self.average_loss)
+        self.previous_close = close
+        self.count += 1
+
+        self.rsi_shifted = self.rsi
+        if self.count < self.window:
+            self.rsi = NAN
+        elif self.average_loss == 0:
+            self.rsi = 100.0
+        else:
+            relative_strength = self.average_gain / self.average_loss
+            self.rsi = 100 - 100 / (1 + relative_strength)
+
+    def evaluate(self, close: float) -> dict:
+        return {
+            'lower_threshold': self.lower_threshold,
+            'upper_threshold': self.upper_threshold,
+            'rsi': self.rsi,
+            'rsi_shifted': self.rsi_shifted,
+            'signal': _label(
+                self.rsi < self.lower_threshold
+                and self.rsi > self.rsi_shifted,
+                self.rsi > self.upper_threshold
+                and self.rsi < self.rsi_shifted
+            ),
+            'current_price': close,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'window': self.window,
+            'lower_threshold': self.lower_threshold,
+            'upper_threshold': self.upper_threshold,
+            'count': self.count,
+            'previous_close': self.previous_close,
+            'average_gain': self.average_gain,
+            'average_loss': self.average_loss,
+            'rsi': self.rsi,
+            'rsi_shifted': self.rsi_shifted,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'RSIState':
+        indicator = cls(
+            state['window'],
+            state['lower_threshold'],
+            state['upper_threshold']
+        )
+        indicator.count = state['count']
+        indicator.previous_close = state['previous_close']
+        indicator.average_gain = state['average_gain']
+        indicator.average_loss = state['average_loss']
+        indicator.rsi = state['rsi']
+        indicator.rsi_shifted = state['rsi_shifted']
+        return indicator
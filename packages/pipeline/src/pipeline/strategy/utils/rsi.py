@@ -1,13 +1,8 @@
+import numpy as np
 import pandas as pd
 import ta
 
-
-def _evaluate_signal(row: pd.Series, lower_threshold: int, upper_threshold: int) -> str:
-    if (row['close'] < lower_threshold) & (row['rsi'] > row['rsi_shifted']):
-        return 'Buy'
-    elif (row['close'] > upper_threshold) & (row['rsi'] < row['rsi_shifted']):
-        return 'Sell'
-    return 'Hold'
+from .signal import select_signal, select_signal_codes
 
 
 def calculate_rsi(
@@ -19,7 +14,47 @@ def calculate_rsi(
     data = data[['close']].sort_index()
     data['rsi'] = ta.momentum.RSIIndicator(data['close']).rsi()
     data['rsi_shifted'] = data['rsi'].shift(1)
-    data['signal'] = data.apply(lambda row: _evaluate_signal(row, lower_threshold, upper_threshold), axis=1)
+    data['signal'] = select_signal(
+        data.index,
+        buy=(data['rsi'] < lower_threshold) & (data['rsi'] > data['rsi_shifted']),
+        sell=(data['rsi'] > upper_threshold) & (data['rsi'] < data['rsi_shifted'])
+    )
     data = data.drop('close', axis=1)
 
-    return data
\ No newline at end of file
+    return data
+
+
+def calculate_rsi_matrix(
+        close: pd.DataFrame,
+        lower_threshold: int = 30,
+        upper_threshold: int = 70,
+        window: int = 14
+        ) -> dict[str, pd.DataFrame]:
+    # Same Wilder smoothing as `ta.momentum.RSIIndicator`, column-wise
+    # Rows before a stock's first bar stay NaN instead of counting as flat
+    diff = close.diff(1)
+    is_bar = close.notna()
+    up_direction = diff.where(diff > 0, 0.0).where(is_bar)
+    down_direction = (-diff.where(diff < 0, 0.0)).where(is_bar)
+    ewm_kwargs = {'alpha': 1 / window, 'min_periods': window, 'adjust': False}
+    emaup = up_direction.ewm(**ewm_kwargs).mean()
+    emadn = down_direction.ewm(**ewm_kwargs).mean()
+
+    rsi = pd.DataFrame(
+        np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn))),
+        index=close.index,
+        columns=close.columns
+    )
+    rsi_shifted = rsi.shift(1)
+    return {
+        'rsi': rsi,
+        'rsi_shifted': rsi_shifted,
+        'signal': pd.DataFrame(
+            select_signal_codes(
+                (rsi < lower_threshold) & (rsi > rsi_shifted),
+                (rsi > upper_threshold) & (rsi < rsi_shifted)
+            ),
+            index=close.index,
+            columns=close.columns
+        ),
+    }
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from enum import Enum
+
+from database import StrategyEvaluation
+
+
+class Signal(int, Enum):
+    HOLD = 0
+    BUY = 1
+    SELL = 2
+
+
+SIGNAL_LABELS = list(StrategyEvaluation.SIGNAL_LABELS)
+
+
+def select_signal_codes(
+        buy: np.ndarray,
+        sell: np.ndarray
+        ) -> np.ndarray:
+    return np.select(
+        [buy, sell],
+        [Signal.BUY.value, Signal.SELL.value],
+        Signal.HOLD.value
+    ).astype(np.int8)
+
+
+def select_signal(
+        index: pd.Index,
+        buy: np.ndarray,
+        sell: np.ndarray
+        ) -> pd.Series:
+    codes = select_signal_codes(buy, sell)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=SIGNAL_LABELS),
+        index=index
+    )
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.strategy.batch import calculate_evaluations
+from pipeline.strategy.init import Strategy
+from pipeline.strategy.utils.bollinger import calculate_bollinger_bands
+from pipeline.strategy.utils.donchian import calculate_donchian_channel
+from pipeline.strategy.utils.rsi import calculate_rsi
+from pipeline.strategy.utils.signal import SIGNAL_LABELS
+
+GAP_STOCK = 'BBBB.JK'
+
+
+@pytest.fixture
+def close() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2025-01-01', periods=80)
+    close = pd.DataFrame(
+        1000 + rng.normal(0, 15, (len(dates), 3)).cumsum(axis=0),
+        index=dates,
+        columns=['AAAA.JK', GAP_STOCK, 'CCCC.JK']
+    )
+    # An illiquid stock without bars on days the others traded, and a stock
+    # that listed later than the rest
+    close.iloc[[30, 31, 55], 1] = np.nan
+    close.iloc[:25, 2] = np.nan
+    return close
+
+
+def _stock_data(close: pd.DataFrame, stock_code: str) -> pd.DataFrame:
+    return close[stock_code].dropna().to_frame('close')
+
+
+def _batch_field(
+        evaluations: dict,
+        strategy: Strategy,
+        name: str,
+        stock_code: str,
+        index: pd.Index
+        ) -> np.ndarray:
+    return evaluations[strategy][name][stock_code].loc[index].to_numpy()
+
+
+def _labels(codes: np.ndarray) -> np.ndarray:
+    return np.asarray(SIGNAL_LABELS)[codes]
+
+
+@pytest.mark.parametrize('stock_code', [GAP_STOCK, 'CCCC.JK'])
+def test_bollinger_bands_match_per_stock(close, stock_code):
+    expected = calculate_bollinger_bands(_stock_data(close, stock_code))
+    evaluations = calculate_evaluations(close)
+
+    for name in ['upper_band', 'lower_band', 'bandwidth']:
+        np.testing.assert_allclose(
+            _batch_field(
+                evaluations,
+                Strategy.BOLLINGER_BANDS,
+                name,
+                stock_code,
+                expected.index
+            ),
+            expected[name].to_numpy()
+        )
+    np.testing.assert_array_equal(
+        _labels(_batch_field(
+            evaluations,
+            Strategy.BOLLINGER_BANDS,
+            'signal',
+            stock_code,
+            expected.index
+        )),
+        expected['signal'].astype(str).to_numpy()
+    )
+
+
+@pytest.mark.parametrize('stock_code', [GAP_STOCK, 'CCCC.JK'])
+def test_donchian_channel_matches_per_stock(close, stock_code):
+    expected = calculate_donchian_channel(_stock_data(close, stock_code))
+    evaluations = calculate_evaluations(close)
+
+    for name in ['rolling_max', 'rolling_min', 'rolling_range']:
+        np.testing.assert_allclose(
+            _batch_field(
+                evaluations,
+                Strategy.DONCHIAN_CHANNEL,
+                name,
+                stock_code,
+                expected.index
+            ),
+            expected[name].to_numpy()
+        )
+
+
+@pytest.mark.parametrize('stock_code', [GAP_STOCK, 'CCCC.JK'])
+def test_rsi_matches_per_stock(close, stock_code):
+    expected = calculate_rsi(_stock_data(close, stock_code))
+    evaluations = calculate_evaluations(close)
+
+    for name in ['rsi', 'rsi_shifted']:
+        np.testing.assert_allclose(
+            _batch_field(
+                evaluations,
+                Strategy.RELATIVE_STRENGTH_INDEX,
+                name,
+                stock_code,
+                expected.index
+            ),
+            expected[name].to_numpy()
+        )
+    np.testing.assert_array_equal(
+        _labels(_batch_field(
+            evaluations,
+            Strategy.RELATIVE_STRENGTH_INDEX,
+            'signal',
+            stock_code,
+            expected.index
+        )),
+        expected['signal'].astype(str).to_numpy()
+    )
+
+
+def test_dates_without_a_bar_are_left_empty(close):
+    evaluations = calculate_evaluations(close)
+
+    rsi = evaluations[Strategy.RELATIVE_STRENGTH_INDEX]['rsi']
+    assert rsi[GAP_STOCK].iloc[[30, 31, 55]].isna().all()
+    assert rsi['CCCC.JK'].iloc[:25].isna().all()
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+
+from database import EmptyFetchRange, StockDaily
+from database.database import db_models
+from database.plans import create_synthetic_database
+
+from pipeline.market.daily import _plan_stock_ranges
+from pipeline.market.utils.calendar import (
+    EMPTY_TTL_DAYS,
+    NO_DATES,
+    get_trading_days,
+    load_empty_days,
+    plan_fetch_ranges,
+    record_empty_ranges
+)
+
+START_DATE = date(2026, 7, 1)
+END_DATE = date(2026, 7, 31)
+GAP = (date(2026, 7, 16), date(2026, 7, 21))
+
+
+@pytest.fixture
+def open_days() -> np.ndarray:
+    return get_trading_days(START_DATE, END_DATE)
+
+
+def _without_gap(days: np.ndarray) -> np.ndarray:
+    return days[
+        (days < np.datetime64(GAP[0])) | (days > np.datetime64(GAP[1]))
+    ]
+
+
+def test_single_key_gap_is_planned(open_days):
+    ranges = plan_fetch_ranges(
+        ['BBBB.JK'],
+        {'BBBB.JK': _without_gap(open_days)},
+        START_DATE,
+        END_DATE,
+        open_days=open_days,
+        fill_gaps=True
+    )
+    assert ranges == {'BBBB.JK': [GAP]}
+
+
+def test_resumed_subset_gap_is_planned(open_days):
+    # The stocks completed before the resume are left out of the plan
+    ranges = plan_fetch_ranges(
+        ['BBBB.JK'],
+        {'BBBB.JK': _without_gap(open_days)},
+        START_DATE,
+        END_DATE,
+        open_days=open_days,
+        fill_gaps=True
+    )
+    full_ranges = plan_fetch_ranges(
+        ['AAAA.JK', 'BBBB.JK'],
+        {'AAAA.JK': open_days, 'BBBB.JK': _without_gap(open_days)},
+        START_DATE,
+        END_DATE,
+        open_days=open_days,
+        fill_gaps=True
+    )
+    assert ranges == full_ranges == {'BBBB.JK': [GAP]}
+
+
+def test_closure_is_not_planned(open_days):
+    closure = np.datetime64('2026-07-08')
+    open_days = open_days[open_days != closure]
+    ranges = plan_fetch_ranges(
+        ['BBBB.JK'],
+        {'BBBB.JK': open_days},
+        START_DATE,
+        END_DATE,
+        open_days=open_days,
+        fill_gaps=True
+    )
+    assert ranges == {}
+
+
+@pytest.mark.parametrize(
+    'stock_codes',
+    [['S0001.JK'], ['S0001.JK', 'S0002.JK']]
+)
+def test_plan_stock_ranges_reads_closures_from_every_stock(stock_codes):
+    database = create_synthetic_database(n_stocks=5, n_days=60, n_sectors=1)
+    with database.bind_ctx(db_models):
+        days = get_trading_days(date.today() - timedelta(days=30), date.today())
+        gap = days[5:8]
+        (
+            StockDaily
+            .delete()
+            .where(
+                (StockDaily.stock == 'S0001.JK')
+                & StockDaily.date.in_([day.item() for day in gap])
+            )
+            .execute()
+        )
+        ranges = _plan_stock_ranges(stock_codes, True, NO_DATES)
+
+    assert ranges == {'S0001.JK': ((gap[0].item(), gap[-1].item()), )}
+
+
+def test_expired_empty_ranges_are_planned_again():
+    database = create_synthetic_database(n_stocks=1, n_days=1, n_sectors=1)
+    with database.bind_ctx(db_models):
+        record_empty_ranges('stock', {'BBBB.JK': [GAP]})
+        assert list(load_empty_days('stock')) == ['BBBB.JK']
+
+        (
+            EmptyFetchRange
+            .update(created_datetime=datetime.now() - timedelta(
+                days=EMPTY_TTL_DAYS + 1
+            ))
+            .execute()
+        )
+        assert load_empty_days('stock') == {}
+
+        # Found empty again, the range is trusted for another TTL
+        record_empty_ranges('stock', {'BBBB.JK': [GAP]})
+        assert list(load_empty_days('stock')) == ['BBBB.JK']
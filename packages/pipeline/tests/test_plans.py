@@ -0,0 +1,20 @@
+import pytest
+
+from database.plans import (
+    HOT_QUERIES,
+    check_query_plans,
+    create_synthetic_database
+)
+
+# Importing the pipeline check registers every hot query
+import pipeline.plans  # noqa: F401
+
+
+@pytest.fixture(scope='module')
+def problems() -> dict[str, list[str]]:
+    return check_query_plans(create_synthetic_database())
+
+
+@pytest.mark.parametrize('name', list(HOT_QUERIES))
+def test_hot_query_plan(problems, name):
+    assert problems[name] == []